@@ -16,6 +16,12 @@ def pytest_addoption(parser):
     parser.addoption("--regenerate-output",
             action="store_true", default=False,
             help="Regenerate test output")
+    parser.addoption("--xmlapi", default=None,
+            help=("XML backend for virtinst: libxml2 (default) or lxml. "
+                  "Can also be set with VIRTINST_XMLAPI"))
+    parser.addoption("--benchmark-json", default=None,
+            help=("For test_benchmark.py, save the timing results "
+                  "as JSON to the passed path"))
 
     # test_urls options
     parser.addoption('--urls-skip-libosinfo',
@@ -47,6 +53,8 @@ def pytest_ignore_collect(path, config):
         return True
     if "test_inject.py" in str(path):
         return True
+    if "test_benchmark.py" in str(path):
+        return True
 
     uitest_file = "tests/uitests" in str(path)
     if uitest_file and not uitests_requested:
@@ -102,5 +110,9 @@ def pytest_configure(config):
     TESTCONFIG.url_force_libosinfo = config.getoption("--urls-force-libosinfo")
     TESTCONFIG.regenerate_output = config.getoption("--regenerate-output")
 
+    if config.getoption("--xmlapi"):
+        from virtinst import xmlapi
+        xmlapi.set_backend(config.getoption("--xmlapi"))
+
     TESTCONFIG.debug = config.getoption("--log-level") == "debug"
     tests.setup_logging()
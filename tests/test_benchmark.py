@@ -0,0 +1,522 @@
+# This work is licensed under the GNU GPLv2 or later.
+# See the COPYING file in the top-level directory.
+
+"""
+Microbenchmarks for the XML subsystem. These are not run by default,
+invoke them explicitly with:
+
+    pytest --capture=no tests/test_benchmark.py
+
+Pass --benchmark-json=FILE to save the results, and compare two saved
+runs with:
+
+    python -m tests.test_benchmark OLD.json NEW.json
+"""
+
+import glob
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from xml.parsers import expat
+
+import pytest
+
+import virtinst
+from virtinst import cli
+from virtinst import xmlapi
+
+from tests import utils
+
+
+XMLPARSE_DIR = utils.DATADIR + "/xmlparse/"
+COMPARE_DIR = utils.DATADIR + "/cli/compare/"
+
+# Bump this if the JSON layout changes incompatibly
+_JSON_VERSION = 1
+_RESULTS = []
+
+
+def _domain_xmls():
+    ret = []
+    for path in sorted(glob.glob(XMLPARSE_DIR + "*.xml")):
+        xml = open(path).read()
+        if xml.lstrip().startswith("<domain ") or "<domain>" in xml[:20]:
+            ret.append(xml)
+    return ret
+
+
+_CORPUS = None
+
+
+def _corpus():
+    """
+    Return {rootname: [xml, ...]} for every single document XML in
+    tests/data/xmlparse and tests/data/cli/compare. Multi document
+    compare output and virt-xml diffs are skipped.
+    """
+    global _CORPUS
+    if _CORPUS is not None:
+        return _CORPUS
+
+    _CORPUS = {}
+    paths = sorted(glob.glob(XMLPARSE_DIR + "*.xml") +
+                   glob.glob(COMPARE_DIR + "*.xml"))
+    for path in paths:
+        xml = open(path).read()
+        try:
+            rootname = xmlapi.stream_extract(xml, [])[0]
+        except expat.ExpatError:
+            continue
+        _CORPUS.setdefault(rootname, []).append(xml)
+
+    # A broken loader would otherwise make every benchmark time nothing
+    assert _CORPUS.get("domain"), "No domain XML found in the corpus"
+    return _CORPUS
+
+
+def _corpus_guests(conn):
+    """
+    Parse every domain XML in the corpus, dropping the ones that
+    don't parse cleanly into a Guest
+    """
+    ret = []
+    for xml in _corpus().get("domain", []):
+        try:
+            guest = virtinst.Guest(conn, parsexml=xml)
+            guest.get_xml()
+        except Exception:  # pylint: disable=broad-except
+            continue
+        ret.append(xml)
+    return ret
+
+
+def _read_all_props(obj):
+    """
+    Read every XMLProperty of obj and all its children, like the
+    virt-manager details page does
+    """
+    count = 0
+    for propname in obj._all_xml_props():  # pylint: disable=protected-access
+        getattr(obj, propname)
+        count += 1
+    for propname in obj._all_child_props():  # pylint: disable=protected-access
+        for child in virtinst.xmlutil.listify(getattr(obj, propname)):
+            count += _read_all_props(child)
+    return count
+
+
+def _report(name, secs, extra=""):
+    print("%-40s %10.3fms %s" % (name, secs * 1000, extra))
+
+
+def _measure(group, name, cb, rounds, items=None, extra=""):
+    """
+    Run cb rounds times, print the mean and record the timing
+    statistics for the JSON output. items is the number of objects
+    processed per round, used to report a per item cost.
+    """
+    times = []
+    for ignore in range(rounds):
+        start = time.perf_counter()
+        cb()
+        times.append(time.perf_counter() - start)
+
+    stats = {
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.mean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": rounds,
+    }
+    if items:
+        stats["items"] = items
+        stats["per_item"] = stats["mean"] / items
+        extra = extra or "(%d items)" % items
+
+    _record(group, name, stats)
+    _report("%s: %s" % (group, name), stats["mean"], extra)
+    return stats["mean"]
+
+
+def _record(group, name, stats):
+    _RESULTS.append({
+        "group": group,
+        "name": name,
+        "fullname": "%s: %s" % (group, name),
+        "stats": stats,
+    })
+
+
+def _machine_info():
+    return {
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "xmlapi_backend": xmlapi.get_backend(),
+    }
+
+
+def _write_json(path):
+    content = {
+        "version": _JSON_VERSION,
+        "datetime": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine_info": _machine_info(),
+        "benchmarks": _RESULTS,
+    }
+    with open(path, "w") as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _save_results(pytestconfig):
+    yield
+    path = pytestconfig.getoption("--benchmark-json")
+    if path and _RESULTS:
+        _write_json(path)
+        print("Benchmark results written to %s" % path)
+
+
+def test_benchmark_property_reads():
+    """
+    Time reading every XMLProperty of every parsed domain in
+    tests/data/xmlparse, with and without the xmlapi node cache
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    xmls = _domain_xmls()
+    guests = [virtinst.Guest(conn, parsexml=xml) for xml in xmls]
+
+    def _read():
+        for guest in guests:
+            _read_all_props(guest)
+
+    origval = xmlapi.XMLAPI.USE_NODE_CACHE
+    try:
+        xmlapi.XMLAPI.USE_NODE_CACHE = False
+        uncached = _measure("property reads", "no node cache",
+                _read, 5, items=len(xmls))
+        xmlapi.XMLAPI.USE_NODE_CACHE = True
+        cached = _measure("property reads", "node cache",
+                _read, 5, items=len(xmls))
+    finally:
+        xmlapi.XMLAPI.USE_NODE_CACHE = origval
+
+    _report("property reads, node cache speedup", cached,
+            "(%.1fx)" % (uncached / cached))
+
+
+_LOOKUP_XPATHS = [
+    "./name",
+    "./@type",
+    "./memory",
+    "./os/type/@arch",
+    "./devices/disk[1]/source/@file",
+    "./devices/disk[2]/target/@dev",
+    "./devices/interface[1]/mac/@address",
+    "./devices/graphics[1]/@type",
+]
+
+
+def test_benchmark_xmlapi_backends():
+    """
+    Compare parse, lookup and get_xml throughput of the xmlapi backends
+    """
+    xmls = _domain_xmls()
+
+    for name in xmlapi.get_backend_names():
+        cls = xmlapi._BACKENDS[name]  # pylint: disable=protected-access
+        try:
+            cls.check_available()
+        except ImportError:
+            print("%s: not available, skipping" % name)
+            continue
+        apis = [cls(xml) for xml in xmls]
+
+        def _parse():
+            # pylint: disable=cell-var-from-loop
+            for xml in xmls:
+                cls(xml)
+
+        def _lookup():
+            # pylint: disable=cell-var-from-loop
+            for api in apis:
+                for xpath in _LOOKUP_XPATHS:
+                    api.get_xpath_content(xpath, False)
+
+        def _get_xml():
+            # pylint: disable=cell-var-from-loop
+            for api in apis:
+                api.get_xml(".")
+
+        # Measure xpath evaluation, not the node cache
+        origval = cls.USE_NODE_CACHE
+        try:
+            cls.USE_NODE_CACHE = False
+            _measure("xmlapi %s" % name, "lookup", _lookup, 20,
+                    items=len(xmls) * len(_LOOKUP_XPATHS))
+        finally:
+            cls.USE_NODE_CACHE = origval
+
+        _measure("xmlapi %s" % name, "parse", _parse, 20, items=len(xmls))
+        _measure("xmlapi %s" % name, "get_xml", _get_xml, 20,
+                items=len(xmls))
+
+
+def test_benchmark_corpus_parse():
+    """
+    Time parsing every domain, network, pool and volume XML in the
+    test corpus into its virtinst object
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    classes = {
+        "domain": virtinst.Guest,
+        "network": virtinst.Network,
+        "pool": virtinst.StoragePool,
+        "volume": virtinst.StorageVolume,
+    }
+
+    for rootname, cls in classes.items():
+        xmls = _corpus().get(rootname, [])
+        if rootname == "domain":
+            xmls = _corpus_guests(conn)
+        if not xmls:
+            continue  # pragma: no cover
+
+        def _parse():
+            # pylint: disable=cell-var-from-loop
+            for xml in xmls:
+                cls(conn, parsexml=xml)
+
+        def _parse_read():
+            # pylint: disable=cell-var-from-loop
+            for xml in xmls:
+                _read_all_props(cls(conn, parsexml=xml))
+
+        _measure("corpus %s" % rootname, "parse", _parse, 5,
+                items=len(xmls))
+        _measure("corpus %s" % rootname, "parse + read all props",
+                _parse_read, 5, items=len(xmls))
+
+
+def test_benchmark_corpus_get_xml():
+    """
+    Time serializing parsed corpus domains, both freshly parsed and
+    after every object has been materialized by a full property read
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    xmls = _corpus_guests(conn)
+    guests = [virtinst.Guest(conn, parsexml=xml) for xml in xmls]
+    for guest in guests:
+        _read_all_props(guest)
+
+    def _get_xml_fresh():
+        for xml in xmls:
+            virtinst.Guest(conn, parsexml=xml).get_xml()
+
+    def _get_xml():
+        for guest in guests:
+            guest.get_xml()
+
+    _measure("corpus domain", "parse + get_xml", _get_xml_fresh, 5,
+            items=len(xmls))
+    _measure("corpus domain", "get_xml", _get_xml, 5, items=len(xmls))
+
+
+def test_benchmark_set_defaults():
+    """
+    Time building a guest from scratch like virt-install does: add
+    devices, fill in defaults and generate the XML
+    """
+    conn = utils.URIs.open_testdefault_cached()
+
+    def _build():
+        guest = virtinst.Guest(conn)
+        guest.os.os_type = "hvm"
+        guest.type = "test"
+        guest.name = "benchmark"
+        guest.currentMemory = 1024 * 1024
+        guest.set_os_name("generic")
+
+        disk = virtinst.DeviceDisk(conn)
+        disk.path = "/dev/default-pool/testvol1.img"
+        guest.add_device(disk)
+        guest.add_device(virtinst.DeviceInterface(conn))
+        guest.add_device(virtinst.DeviceGraphics(conn))
+        guest.add_device(virtinst.DeviceInput(conn))
+
+        guest.set_defaults(None)
+        return guest.get_xml()
+
+    _measure("build", "set_defaults + get_xml", _build, 20)
+
+
+def test_benchmark_device_add_remove():
+    """
+    Time adding and removing devices on every parsed corpus domain
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    xmls = _corpus_guests(conn)
+    guests = [virtinst.Guest(conn, parsexml=xml) for xml in xmls]
+
+    def _add_remove():
+        for guest in guests:
+            devs = []
+            for cls in [virtinst.DeviceDisk, virtinst.DeviceInterface,
+                        virtinst.DeviceSound]:
+                dev = cls(conn)
+                guest.add_device(dev)
+                devs.append(dev)
+            guest.get_xml()
+            for dev in devs:
+                guest.remove_device(dev)
+
+    def _remove_readd():
+        for guest in guests:
+            devs = guest.devices.get_all()
+            for dev in devs:
+                guest.remove_device(dev)
+            for dev in devs:
+                guest.add_device(dev)
+
+    _measure("device", "add + get_xml + remove", _add_remove, 5,
+            items=len(xmls))
+    _measure("device", "remove + readd all", _remove_readd, 5,
+            items=len(xmls))
+
+
+def test_benchmark_guest_memory():
+    """
+    Report the memory retained per parsed Guest, with every child
+    object materialized, like vmmConnection keeps them around
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    xmls = _corpus_guests(conn)
+    assert xmls, "No corpus domain XML parsed into a Guest"
+    # Warm up one time class setup like the XMLProperty caches
+    for xml in xmls:
+        _read_all_props(virtinst.Guest(conn, parsexml=xml))
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        guests = [virtinst.Guest(conn, parsexml=xml) for xml in xmls]
+        for guest in guests:
+            _read_all_props(guest)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in
+                after.compare_to(before, "filename"))
+    per_guest = total / len(guests)
+    _record("memory", "bytes per parsed Guest", {
+        "median": per_guest,
+        "items": len(guests),
+        "unit": "bytes",
+    })
+    print("%-40s %10.0f bytes (%d domains)" %
+          ("memory: bytes per parsed Guest", per_guest, len(guests)))
+
+
+# (cli parser class, virt-xml --edit option string)
+_EDIT_OPTIONS = [
+    (cli.ParserDisk, "cache=none,io=native"),
+    (cli.ParserNetwork, "model.type=virtio"),
+    (cli.ParserGraphics, "listen=none"),
+    (cli.ParserMemory, "memory=2048,currentMemory=1024"),
+]
+
+
+def test_benchmark_virtxml_edit():
+    """
+    Time virt-xml style edit round trips over the corpus: parse the
+    domain, apply an --edit option string, generate the new XML and
+    parse it back
+    """
+    conn = utils.URIs.open_testdefault_cached()
+    xmls = _corpus_guests(conn)
+
+    for parserclass, optstr in _EDIT_OPTIONS:
+        # Only time domains that have an object to edit
+        editxmls = []
+        for xml in xmls:
+            guest = virtinst.Guest(conn, parsexml=xml)
+            if not parserclass.guest_propname:
+                editxmls.append(xml)
+            elif virtinst.xmlutil.listify(parserclass.lookup_prop(guest)):
+                editxmls.append(xml)
+        if not editxmls:
+            continue  # pragma: no cover
+
+        def _edit():
+            # pylint: disable=cell-var-from-loop
+            for xml in editxmls:
+                guest = virtinst.Guest(conn, parsexml=xml)
+                inst = guest
+                if parserclass.guest_propname:
+                    inst = virtinst.xmlutil.listify(
+                            parserclass.lookup_prop(guest))[0]
+                parserobj = parserclass(optstr, guest=guest, editing=True)
+                parserobj.parse(inst)
+                virtinst.Guest(conn, parsexml=guest.get_xml())
+
+        _measure("virt-xml edit", "--%s %s" %
+                (parserclass.cli_arg_name, optstr),
+                _edit, 5, items=len(editxmls))
+
+
+#########################
+# Result comparison CLI #
+#########################
+
+def _load_results(path):
+    content = json.load(open(path))
+    if content.get("version") != _JSON_VERSION:
+        raise ValueError("%s: unsupported benchmark JSON version %s" %
+                         (path, content.get("version")))
+    return {b["fullname"]: b["stats"] for b in content["benchmarks"]}
+
+
+def compare_results(oldpath, newpath, threshold=0.10):
+    """
+    Print a per benchmark comparison of two --benchmark-json files.
+    Return the list of benchmarks that got slower by more than
+    threshold.
+    """
+    old = _load_results(oldpath)
+    new = _load_results(newpath)
+    regressions = []
+
+    def _fmt(stats):
+        if stats.get("unit") == "bytes":
+            return "%9.0fB" % stats["median"]
+        return "%9.3fms" % (stats["median"] * 1000)
+
+    print("%-50s %10s %10s %8s" % ("benchmark", "old", "new", "change"))
+    for name in sorted(set(old) | set(new)):
+        if name not in old or name not in new:
+            print("%-50s %s" % (name,
+                  "(only in %s)" % (name in old and oldpath or newpath)))
+            continue
+        oldval = old[name]["median"]
+        newval = new[name]["median"]
+        change = (newval - oldval) / oldval if oldval else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = " !"
+        print("%-50s %s %s %+7.1f%%%s" %
+              (name, _fmt(old[name]), _fmt(new[name]), change * 100, flag))
+    return regressions
+
+
+if __name__ == "__main__":  # pragma: no cover
+    if len(sys.argv) != 3:
+        print("Usage: python -m tests.test_benchmark OLD.json NEW.json")
+        sys.exit(2)
+    sys.exit(bool(compare_results(sys.argv[1], sys.argv[2])))
@@ -108,3 +108,104 @@ def testDomainCapabilitiesAArch64():
 
     assert not caps.supports_filesystem_virtiofs()
     assert not caps.supports_memorybacking_memfd()
+
+
+def testDomainCapabilitiesCache(tmp_path):
+    conn = utils.URIs.open_kvm()
+    conn.host_cache_dir = str(tmp_path)
+
+    fetched = []
+    origfunc = conn.getDomainCapabilities
+    def _fetch(*args, **kwargs):
+        fetched.append(args)
+        return origfunc(*args, **kwargs)
+    conn.getDomainCapabilities = _fetch
+
+    # Same parameters share one parsed object
+    params = ("/usr/bin/qemu-system-x86_64", "x86_64", "q35", "kvm")
+    caps = DomainCapabilities.build_from_params(conn, *params)
+    assert DomainCapabilities.build_from_params(conn, *params) is caps
+    assert len(fetched) == 1
+
+    # Invalidating drops the object, but the XML comes from the host cache
+    conn.invalidate_caps()
+    caps2 = DomainCapabilities.build_from_params(conn, *params)
+    assert caps2 is not caps
+    assert caps2.get_xml() == caps.get_xml()
+    assert len(fetched) == 1
+
+    # Nothing is written until the connection is closed
+    assert not list(tmp_path.glob("*.json"))
+    conn.close()
+
+    # A new connection reuses the on disk XML
+    conn2 = utils.URIs.open_kvm()
+    conn2.host_cache_dir = str(tmp_path)
+    conn2.getDomainCapabilities = _fetch
+    caps3 = DomainCapabilities.build_from_params(conn2, *params)
+    assert caps3.get_xml() == caps.get_xml()
+    assert len(fetched) == 1
+
+    # A hypervisor version change throws the stored data away
+    conn3 = utils.URIs.open_kvm()
+    conn3.host_cache_dir = str(tmp_path)
+    conn3.getDomainCapabilities = _fetch
+    conn3.conn_version = lambda: 1
+    DomainCapabilities.build_from_params(conn3, *params)
+    assert len(fetched) == 2
+
+    # Disabled by default
+    assert utils.URIs.open_kvm().get_host_cache() is None
+
+
+def testHostCacheCapsSupport(tmp_path):
+    conn = utils.URIs.open_kvm()
+    conn.host_cache_dir = str(tmp_path)
+    conn.invalidate_caps()
+    capsxml = conn.caps.get_xml()
+    assert conn.support.conn_autosocket()
+    conn.close()
+
+    # Second connection reads both from disk, without asking libvirt
+    conn2 = utils.URIs.open_kvm()
+    conn2.host_cache_dir = str(tmp_path)
+    conn2._caps = None  # pylint: disable=protected-access
+    def _fail(*args, **kwargs):
+        raise AssertionError("should not be called")
+    conn2.get_conn_for_api_arg().getCapabilities = _fail
+    assert conn2.caps.get_xml() == capsxml
+
+    hostcache = conn2.get_host_cache()
+    assert any(hostcache.get("support", key) for key in
+               hostcache._sections["support"])  # pylint: disable=protected-access
+    conn2.daemon_version = _fail
+    assert conn2.support.conn_autosocket()
+
+
+def testHostCacheMerge(tmp_path):
+    # Concurrent writers keep each other's entries, clears win
+    from virtinst.hostcache import HostCache
+    uri = "test:///default"
+    cache1 = HostCache(str(tmp_path), uri, [1, 2])
+    cache2 = HostCache(str(tmp_path), uri, [1, 2])
+    cache1.set("support", "a", True)
+    cache2.set("support", "b", False)
+    cache2.set("caps", "xml", "<capabilities/>")
+    cache1.save()
+    cache2.save()
+
+    cache3 = HostCache(str(tmp_path), uri, [1, 2])
+    assert cache3.get("support", "a") is True
+    assert cache3.get("support", "b") is False
+    cache3.clear_section("caps")
+    cache3.save()
+    assert HostCache(str(tmp_path), uri, [1, 2]).get("caps", "xml") is None
+    assert HostCache(str(tmp_path), uri, [1, 3]).get("support", "a") is None
+
+    # Once saved, nothing like an atexit hook keeps the cache alive
+    import weakref
+    cacheref = weakref.ref(cache1)
+    cache1.set("support", "c", True)
+    cache1.save()
+    del cache1
+    assert cacheref() is None
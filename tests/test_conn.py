@@ -2,14 +2,18 @@
 # See the COPYING file in the top-level directory.
 
 import os
+import threading
 
 import pytest
 
+import virtinst
 from virtinst import cli
 from virtinst import pollhelpers
 from virtinst import StoragePool
 from virtinst import URI
 
+from tests import utils
+
 
 ############################
 # VirtinstConnection tests #
@@ -92,3 +96,168 @@ def test_poll():
     poolobj1.undefine()
     poolobj2.destroy()
     poolobj2.undefine()
+
+
+def test_fetch_cache():
+    # Indexed lookups over the fetch_all_* caches, and invalidation
+    # pylint: disable=protected-access
+    conn = utils.URIs.openconn(utils.URIs.test_full)
+
+    assert conn.fetch_nodedev_by_name("computer").name == "computer"
+    assert conn.fetch_nodedev_by_name("idontexist") is None
+
+    vols = conn.fetch_vols_by_path("/pool-dir/default-vol")
+    assert [vol.name for vol in vols] == ["default-vol"]
+    assert not conn.fetch_vols_by_path("/idontexist")
+
+    vms = conn.fetch_domains_by_mac("22:22:33:44:aa:bb")
+    assert [vm.name for vm in vms] == ["test-many-devices"]
+    assert conn.fetch_domains_by_path([], ["/pool-dir/test-arm-kernel"])
+    assert not conn.fetch_domains_by_path(["/pool-dir/test-arm-kernel"])
+
+    # Defining a domain through the connection drops the domain cache
+    guest = virtinst.Guest(conn)
+    guest.name = "fetch-cache-test"
+    guest.type = "test"
+    guest.os.os_type = "hvm"
+    guest.currentMemory = 1024
+    nic = virtinst.DeviceInterface(conn)
+    nic.macaddr = "22:33:44:55:66:77"
+    guest.add_device(nic)
+    dom = conn.defineXML(guest.get_xml())
+    try:
+        vms = conn.fetch_domains_by_mac("22:33:44:55:66:77")
+        assert [vm.name for vm in vms] == ["fetch-cache-test"]
+    finally:
+        dom.undefine()
+    assert conn.fetch_domains_by_mac("22:33:44:55:66:77")
+    conn.invalidate_fetch_cache()
+    assert not conn.fetch_domains_by_mac("22:33:44:55:66:77")
+
+    # Expired entries are refetched
+    conn.fetch_cache_ttl = 60
+    vms = conn.fetch_all_domains()
+    assert conn.fetch_all_domains()[0] is vms[0]
+    conn._fetch_cache[conn._FETCH_KEY_DOMAINS].timestamp -= 120
+    assert conn.fetch_all_domains()[0] is not vms[0]
+
+
+def test_fetch_cache_nodedevs():
+    # Nodedev indexes match a linear scan, in fetch order
+    conn = utils.URIs.open_testdriver_cached()
+    nodedevs = conn.fetch_all_nodedevs()
+
+    for devtype in ["pci", "usb_device", "net", "drm", "idontexist"]:
+        assert (conn.fetch_nodedevs_by_type(devtype) ==
+                [d for d in nodedevs if d.device_type == devtype])
+
+    children = conn.fetch_nodedevs_by_parent("pci_8086_1049")
+    assert [d.name for d in children] == ["net_00_1c_25_10_b1_e4"]
+    assert not conn.fetch_nodedevs_by_parent("idontexist")
+
+    hubs = conn.fetch_nodedevs_by_usbid("0x1d6b", "0x0002")
+    assert len(hubs) > 1
+    assert hubs == [d for d in nodedevs if
+                    d.vendor_id == "0x1d6b" and d.product_id == "0x0002"]
+
+
+def test_fetch_cache_override():
+    # virt-manager style cb_fetch_all_* callbacks, whose results are
+    # cached and incrementally reindexed while cb_fetch_generation
+    # doesn't change
+    conn = utils.URIs.openconn(utils.URIs.test_full)
+    vms = conn.fetch_all_domains()
+    current = vms[:]
+    state = {"generation": 0, "calls": 0}
+
+    def fetch_all_domains():
+        state["calls"] += 1
+        return current[:]
+
+    conn.cb_fetch_all_domains = fetch_all_domains
+    conn.cb_fetch_generation = lambda: state["generation"]
+    try:
+        users = conn.fetch_domains_by_mac("22:22:33:44:aa:bb")
+        assert [vm.name for vm in users] == ["test-many-devices"]
+        conn.fetch_domains_by_mac("22:22:33:44:aa:bb")
+        assert state["calls"] == 1
+
+        # Replace the VM with a new XML object with a different MAC
+        idx = current.index(users[0])
+        newvm = virtinst.Guest(conn, parsexml=users[0].get_xml().replace(
+            "22:22:33:44:AA:BB", "22:22:33:44:AA:BC"))
+        current[idx] = newvm
+        state["generation"] += 1
+
+        assert not conn.fetch_domains_by_mac("22:22:33:44:aa:bb")
+        assert conn.fetch_domains_by_mac("22:22:33:44:aa:bc") == [newvm]
+        assert state["calls"] == 2
+
+        # Results stay in fetch order
+        disk_paths = ["/pool-dir/test-arm-kernel"] + [
+            d.get_source_path() for d in newvm.devices.disk]
+        users = conn.fetch_domains_by_path(disk_paths,
+                ["/pool-dir/test-arm-kernel"])
+        assert users == [vm for vm in current if vm in users]
+        assert newvm in users
+
+        # Edit the cached XML object in place, like a hotplug does
+        newvm.devices.interface[0].macaddr = "22:22:33:44:AA:BD"
+        disk = newvm.devices.disk[0]
+        oldpath = disk.get_source_path()
+        disk.set_source_path("/some/new/path.img")
+        state["generation"] += 1
+
+        assert not conn.fetch_domains_by_mac("22:22:33:44:aa:bc")
+        assert conn.fetch_domains_by_mac("22:22:33:44:aa:bd") == [newvm]
+        assert newvm not in conn.fetch_domains_by_path([oldpath])
+        assert conn.fetch_domains_by_path(
+                ["/some/new/path.img"]) == [newvm]
+        assert state["calls"] == 3
+    finally:
+        conn.cb_fetch_all_domains = None
+        conn.cb_fetch_generation = None
+
+
+def test_fetch_concurrency():
+    # Parallel XMLDesc fetching returns the same objects in the same order
+    results = []
+    for concurrency in [1, 8]:
+        conn = utils.URIs.openconn(utils.URIs.test_full)
+        conn.invalidate_fetch_cache()
+        conn.fetch_concurrency = concurrency
+        results.append([
+            [obj.get_xml() for obj in conn.fetch_all_domains()],
+            [obj.get_xml() for obj in conn.fetch_all_pools()],
+            [obj.get_xml() for obj in conn.fetch_all_vols()],
+            [obj.name for obj in conn.fetch_all_nodedevs()],
+        ])
+        conn.close()
+    assert results[0] == results[1]
+    assert all(results[0])
+
+
+def test_fetch_cache_threads():
+    # Concurrent first lookups build each entry and index exactly once
+    conn = utils.URIs.openconn(utils.URIs.test_full)
+    conn.invalidate_fetch_cache()
+    built = []
+    origfunc = conn._fetch_all_nodedevs_raw  # pylint: disable=protected-access
+    def _fetch():
+        built.append(1)
+        return origfunc()
+    conn._fetch_all_nodedevs_raw = _fetch  # pylint: disable=protected-access
+
+    results = []
+    def _lookup():
+        results.append([d.name for d in conn.fetch_nodedevs_by_type("pci")])
+
+    threads = [threading.Thread(target=_lookup) for dummy in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert len(results) == 8
+    assert results[0] and all(r == results[0] for r in results)
@@ -116,6 +116,27 @@ def test_misc_nonpredicatble_generate():
     # Ensure check_mac_in_use doesn't error on None
     virtinst.DeviceInterface.check_mac_in_use(predconn, None)
 
+    # Batch generation hands out unique MACs, and remembers them
+    macs = virtinst.DeviceInterface.generate_macs(kvmconn, 20)
+    assert len(set(macs)) == 20
+    assert all(kvmconn.is_mac_in_use(mac.upper()) for mac in macs)
+    assert not kvmconn.is_mac_in_use("52:54:00:00:00:00")
+
+    # Reservations are dropped by release_mac, or once a guest using
+    # the MAC is defined
+    kvmconn.release_mac(macs[0].upper())
+    assert not kvmconn.is_mac_in_use(macs[0])
+    xml = ("<domain type='test'><name>test-release-mac</name>"
+           "<memory>65536</memory><os><type>hvm</type></os>"
+           "<devices><interface type='user'><mac address='%s'/>"
+           "</interface></devices></domain>" % macs[1])
+    testconn.reserve_mac(macs[1])
+    dom = testconn.defineXML(xml)
+    dom.undefine()
+    assert not testconn.is_mac_in_use(macs[1])
+    assert utils.URIs.open_testdriver_cached().is_mac_in_use(
+            "22:22:33:44:AA:BB")
+
 
 def test_misc_support_cornercases():
     """
@@ -241,3 +262,48 @@ def test_misc_meter():
     # BaseMeter coverage
     meter = _progresspriv.BaseMeter()
     _test_meter_values(meter)
+
+
+def test_misc_cli_lookup():
+    """
+    virt-xml style device lookups shouldn't reparse every candidate
+    device when matching plain XMLProperty values
+    """
+    from virtinst import cli
+    conn = utils.URIs.open_testdefault_cached()
+    xml = open(utils.DATADIR + "/xmlparse/change-disk-in.xml").read()
+    guest = virtinst.Guest(conn, parsexml=xml)
+    assert len(guest.devices.disk) == 11
+
+    origparse = virtinst.DeviceDisk.__init__
+    parsecount = []
+
+    def _counting_init(self, *args, **kwargs):
+        parsecount.append(1)
+        return origparse(self, *args, **kwargs)
+
+    with unittest.mock.patch.object(
+            virtinst.DeviceDisk, "__init__", _counting_init):
+        parser = cli.ParserDisk("target=hdc,readonly=on", guest=guest)
+        found = parser.lookup_child_from_option_string()
+        assert [d.target for d in found] == ["hdc"]
+        assert not parsecount
+
+        # path= is a regular python property, so this still uses
+        # a temporary copy of each disk
+        parser = cli.ParserDisk("path=/dev/null", guest=guest)
+        parser.lookup_child_from_option_string()
+        assert parsecount
+
+    # The converted value matches a set + get round trip
+    disk = guest.devices.disk[0]
+    for propname, val in [("read_only", "on"), ("boot.order", "0x10")]:
+        setter = virtinst.DeviceDisk(conn, parsexml=disk.get_xml())
+        virtinst.xmlutil.set_prop_path(setter, propname, val)
+        pieces = propname.split(".")
+        parent = disk
+        for piece in pieces[:-1]:
+            parent = getattr(parent, piece)
+        prop = getattr(type(parent), pieces[-1])
+        assert (prop.convert_value(val) ==
+                virtinst.xmlutil.get_prop_path(setter, propname))
@@ -205,3 +205,31 @@ def testNodeDevFail():
     # pass to a guest.
     with pytest.raises(ValueError):
         _testNode2DeviceCompare(conn, nodename, devfile)
+
+
+def testNodeDeviceRecord():
+    # The streamed NodeDeviceRecord must match a full NodeDevice parse
+    from virtinst.nodedev import NodeDeviceRecord
+    conn = utils.URIs.open_testdriver_cached()
+    for node in conn.listAllDevices():
+        xml = node.XMLDesc(0)
+        record = NodeDeviceRecord(conn, xml)
+        nodedev = NodeDevice(conn, xml)
+
+        for propname in nodedev._all_xml_props():
+            assert getattr(record, propname) == getattr(nodedev, propname)
+        assert ([(d.node_type, d.path) for d in record.devnodes] ==
+                [(d.node_type, d.path) for d in nodedev.devnodes])
+        assert record.is_drm_render() == nodedev.is_drm_render()
+
+    # Non-property access falls back to a full parse
+    assert record.get_xml() == nodedev.get_xml()
+    assert record.get_nodedev() is record.get_nodedev()
+
+    # Sanitizing still works
+    record = NodeDeviceRecord(conn, funky_chars_xml)
+    assert record.device_type == "LENOVO"
+
+    # Unparseable XML raises the same as a full parse
+    with pytest.raises(Exception):
+        NodeDeviceRecord(conn, "<device><name>foo")
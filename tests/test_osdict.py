@@ -19,6 +19,7 @@ from tests import utils
 
 
 def test_list_os():
+    OSDB.load()
     OSDB.list_os()
 
 
@@ -241,3 +241,18 @@ def testEnumerateLogical():
     lst = StoragePool.pool_list_from_sources(conn,
                                              StoragePool.TYPE_LOGICAL)
     assert lst == ["testvg1", "testvg2"]
+
+
+def testFindFreeVolName():
+    conn = utils.URIs.open_testdriver_cached()
+    poolobj = conn.storagePoolLookupByName("pool-dir")
+
+    # Collisions are checked against a single volume listing
+    def _fail(*args, **kwargs):
+        raise AssertionError("should not be called")
+    poolobj.storageVolLookupByName = _fail
+    name = StorageVolume.find_free_name(conn, poolobj, "default-vol")
+    assert name == "default-vol-1"
+    name = StorageVolume.find_free_name(conn, poolobj, "newvol",
+            suffix=".img")
+    assert name == "newvol.img"
@@ -1170,3 +1170,246 @@ def testDiskSourceAbspath():
     # ...unless it's a URL
     disk.set_source_path("http://example.com/foobar3")
     assert disk.get_source_path() == "http://example.com/foobar3"
+
+
+def testLazyChildParse():
+    # Child objects are built on first access. Make sure XML changes
+    # made before then don't alter what they parse to
+    conn = utils.URIs.open_testdefault_cached()
+    xml = open(DATADIR + "change-disk-in.xml").read()
+    guest = virtinst.Guest(conn, parsexml=xml)
+    disks = guest.devices.disk
+    assert len(disks) == 11
+
+    # disk[1] seclabels haven't been parsed yet, and its xpath index
+    # shifts when disk[0] is removed
+    guest.remove_device(disks[0])
+    disk = guest.devices.disk[0]
+    assert disk.get_xml_id() == "./devices/disk[1]"
+    assert [s.model for s in disk.seclabels] == ["selinux", "dac"]
+    assert guest.devices.disk[1].seclabels == []
+
+
+def testCompactXMLState():
+    # XMLBuilder bookkeeping uses __slots__ and shares xpath strings
+    # pylint: disable=protected-access
+    conn = utils.URIs.open_testdefault_cached()
+    xml = open(DATADIR + "change-disk-in.xml").read()
+    guest1 = virtinst.Guest(conn, parsexml=xml)
+    guest2 = virtinst.Guest(conn, parsexml=xml)
+    disk1 = guest1.devices.disk[1]
+    disk2 = guest2.devices.disk[1]
+
+    assert not hasattr(disk1._xmlstate, "__dict__")
+    assert "_propstore" not in disk1.__dict__
+    assert (disk1._xmlstate._relative_object_xpath is
+            disk2._xmlstate._relative_object_xpath)
+
+    # Subclasses can still set their own attributes
+    disk1.storage_was_created = True
+    guest1.remove_device(guest1.devices.disk[0])
+    assert disk1.get_xml_id() == "./devices/disk[1]"
+    assert disk1.storage_was_created
+
+
+def testXMLAPINodeCache():
+    # Make sure cached xpath lookups are invalidated by XML edits
+    api = virtinst.xmlapi.XMLAPI("<foo><bar baz='1'/><bar baz='2'/></foo>")
+    assert api.get_xpath_content("./bar[@baz='2']/@baz", False) == "2"
+    assert api.get_xpath_content("./bar[2]/@baz", False) == "2"
+    assert api.get_xpath_content("./new/@val", False) is None
+
+    api.set_xpath_content("./bar[2]/@baz", "3")
+    assert api.get_xpath_content("./bar[@baz='2']/@baz", False) is None
+    assert api.get_xpath_content("./bar[@baz='3']/@baz", False) == "3"
+
+    api.node_force_remove("./bar[1]")
+    assert api.get_xpath_content("./bar[1]/@baz", False) == "3"
+    assert api.get_xpath_content("./bar[2]/@baz", False) is None
+
+    api.set_xpath_content("./new/@val", "x")
+    assert api.get_xpath_content("./new/@val", False) == "x"
+    api.node_clear("./new")
+    assert api.get_xpath_content("./new/@val", False) is None
+
+
+def _backend_compare_docs():
+    """
+    Return (path, xml) for every XML document in tests/data/xmlparse and
+    tests/data/cli/compare. Multi guest compare output is split into
+    separate documents, virt-xml diffs and other non-XML are skipped
+    """
+    import glob
+    import re
+    from xml.parsers import expat
+    from virtinst import xmlapi
+
+    paths = sorted(glob.glob(DATADIR + "*.xml") +
+                   glob.glob(utils.DATADIR + "/cli/compare/*.xml"))
+    ret = []
+    for path in paths:
+        content = open(path).read()
+        docs = re.split(r"(?<=</domain>)\n(?=<domain)", content)
+        try:
+            for doc in docs:
+                xmlapi.stream_extract(doc, [])
+        except expat.ExpatError:
+            continue
+        ret.extend([(path, doc) for doc in docs])
+    return ret
+
+
+def testXMLAPIBackends():
+    # Check the lxml backend generates byte identical XML to libxml2,
+    # for every document in the xmlparse and cli compare test data
+    from virtinst import xmlapi
+    try:
+        xmlapi._LxmlAPI.check_available()
+    except ImportError:
+        pytest.skip("lxml is not installed")
+
+    def _edit(api):
+        api.set_xpath_content("./name", "newname & <more>")
+        api.set_xpath_content("./devices/disk[1]/@type", "block")
+        api.set_xpath_content("./devices/disk[1]/driver", None)
+        api.set_xpath_content("./os/boot[@dev='network']", True)
+        api.set_xpath_content("./qemu:commandline/qemu:arg[1]/@value", "x")
+        api.set_xpath_content("./features/acpi", False)
+        api.node_force_remove("./devices/interface[1]")
+        api.node_add_xml("<sound model='ich9'>\n  <codec/>\n</sound>",
+                "./devices")
+        api.node_clear("./clock")
+        return api.get_xml(".")
+
+    docs = _backend_compare_docs()
+    assert len(docs) > 150
+    for path, xml in docs:
+        libxml2api = xmlapi._Libxml2API(xml)
+        lxmlapi = xmlapi._LxmlAPI(xml)
+        assert lxmlapi.get_xml(".") == libxml2api.get_xml("."), path
+        assert (_edit(lxmlapi.copy_api()) ==
+                _edit(libxml2api.copy_api())), path
+
+
+def testXMLAPIBackendsObjects():
+    # Same as testXMLAPIBackends, but parsing and editing through the
+    # virtinst objects, which is what the cli compare suite exercises
+    from virtinst import xmlapi
+    try:
+        xmlapi._LxmlAPI.check_available()
+    except ImportError:
+        pytest.skip("lxml is not installed")
+
+    conn = utils.URIs.open_testdefault_cached()
+    classes = {
+        "domain": virtinst.Guest,
+        "domainsnapshot": virtinst.DomainSnapshot,
+        "network": virtinst.Network,
+        "pool": virtinst.StoragePool,
+        "volume": virtinst.StorageVolume,
+    }
+
+    def _build(cls, xml):
+        obj = cls(conn, parsexml=xml)
+        origxml = obj.get_xml()
+        if cls is not virtinst.Guest:
+            return origxml, None
+
+        obj.name = "newname"
+        obj.description = "foo & <bar>"
+        for dev in obj.devices.interface[:1] + obj.devices.disk[:1]:
+            obj.remove_device(dev)
+        sound = virtinst.DeviceSound(conn)
+        sound.model = "ich9"
+        obj.add_device(sound)
+        return origxml, obj.get_xml()
+
+    origbackend = xmlapi.get_backend()
+    count = 0
+    try:
+        for path, xml in _backend_compare_docs():
+            cls = classes.get(xmlapi.stream_extract(xml, [])[0])
+            if not cls:
+                continue
+            xmlapi.set_backend("libxml2")
+            libxml2ret = _build(cls, xml)
+            xmlapi.set_backend("lxml")
+            lxmlret = _build(cls, xml)
+            assert lxmlret == libxml2ret, path
+            count += 1
+    finally:
+        xmlapi.set_backend(origbackend)
+    assert count > 150
+
+
+def testBuildGetXMLCache():
+    # get_xml for build objects is cached until something changes
+    conn = utils.URIs.open_testdefault_cached()
+    guest = virtinst.Guest(conn)
+    guest.name = "foo"
+    xml1 = guest.get_xml()
+    assert guest.get_xml() is xml1
+
+    guest.name = "bar"
+    xml2 = guest.get_xml()
+    assert "<name>bar</name>" in xml2
+
+    disk = virtinst.DeviceDisk(conn)
+    disk.set_source_path("/dev/null")
+    guest.add_device(disk)
+    xml3 = guest.get_xml()
+    assert "/dev/null" in xml3
+    disk.target = "vdz"
+    assert "vdz" in guest.get_xml()
+    assert "vdz" in disk.get_xml()
+
+    guest.remove_device(disk)
+    assert "/dev/null" not in guest.get_xml()
+
+    action = guest.xml_actions.new()
+    guest.xml_actions.append(action)
+    action.xpath_set = "./title=hello"
+    assert "<title>hello</title>" in guest.get_xml()
+
+    # Dropping the action, even on a child object, invalidates the cache
+    guest.xml_actions.clear()
+    xml4 = guest.get_xml()
+    assert "<title>" not in xml4
+    assert guest.get_xml() is xml4
+    action = guest.os.xml_actions.new()
+    action.xpath_set = "./title=child"
+    guest.os.xml_actions.append(action)
+    assert guest.get_xml() is not xml4
+
+
+def testPropsSnapshot():
+    conn = utils.URIs.open_testdefault_cached()
+    xml = open(DATADIR + "change-disk-in.xml").read()
+    guest = virtinst.Guest(conn, parsexml=xml)
+    disk = guest.devices.disk[1]
+
+    # Snapshot values match reading the properties one by one
+    snap = disk.get_props_snapshot()
+    for propname in disk._all_xml_props():
+        assert getattr(snap, propname) == getattr(disk, propname)
+    assert snap.as_dict()["bus"] == "ide"
+    with pytest.raises(AttributeError):
+        snap.bus = "foo"
+    with pytest.raises(AttributeError):
+        getattr(snap, "idontexist")
+
+    # Cached until something changes
+    names = ["bus", "read_only", "target"]
+    snap = disk.get_props_snapshot(names)
+    assert disk.get_props_snapshot(names) is snap
+    disk.bus = "scsi"
+    snap = disk.get_props_snapshot(names)
+    assert snap.bus == "scsi"
+    assert snap.read_only is False
+    assert snap.target == "hdb"
+
+    # Props with ../ in the xpath
+    chardev = virtinst.DeviceSerial(conn,
+        parsexml="<serial type='tcp'><protocol type='telnet'/>"
+                 "<target port='0'/></serial>")
+    assert chardev.source.get_props_snapshot(["protocol"]).protocol == "telnet"
@@ -147,12 +147,12 @@ class _URIs(object):
             conn.fetch_all_nodedevs()
 
             self._conn_cache[uri] = {}
-            for key, value in conn._fetch_cache.items():
-                self._conn_cache[uri][key] = value[:]
+            for key, entry in conn._fetch_cache.items():
+                self._conn_cache[uri][key] = entry.objs[:]
 
         # Prime the internal connection cache
         for key, value in self._conn_cache[uri].items():
-            conn._fetch_cache[key] = value[:]
+            conn._set_fetch_cache(key, value[:])
 
         def cb_cache_new_pool(poolobj):
             # Used by clonetest.py nvram-newpool test
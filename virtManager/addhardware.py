@@ -58,6 +58,8 @@ class vmmAddHardware(vmmGObjectUI):
 
         self._remove_usb_controller = None
         self._selected_model = None
+        # MAC reserved on the connection by generate_mac
+        self._generated_mac = None
 
         self._gfxdetails = vmmGraphicsDetails(
             self.vm, self.builder, self.topwin)
@@ -126,9 +128,15 @@ class vmmAddHardware(vmmGObjectUI):
             self.topwin.hide()
         if self._storagebrowser:
             self._storagebrowser.close()
+        self._release_generated_mac()
 
         return 1
 
+    def _release_generated_mac(self):
+        if self._generated_mac and self.conn:
+            self.conn.get_backend().release_mac(self._generated_mac)
+        self._generated_mac = None
+
     def _cleanup(self):
         self.vm = None
         self.conn = None
@@ -293,7 +301,9 @@ class vmmAddHardware(vmmGObjectUI):
 
 
         # Network init
+        self._release_generated_mac()
         newmac = DeviceInterface.generate_mac(self.conn.get_backend())
+        self._generated_mac = newmac
         self.widget("mac-address").set_active(bool(newmac))
         self.widget("create-mac-address").set_text(newmac)
         self._change_macaddr_use()
@@ -767,7 +777,9 @@ class vmmAddHardware(vmmGObjectUI):
         model.clear()
 
         devs = self.conn.filter_nodedevs(devtype)
-        netdevs = self.conn.filter_nodedevs("net")
+        netdevs = {}
+        for netdev in self.conn.filter_nodedevs("net"):
+            netdevs.setdefault(netdev.xmlobj.parent, []).append(netdev)
         for dev in devs:
             if dev.xmlobj.is_usb_linux_root_hub():
                 continue
@@ -776,17 +788,16 @@ class vmmAddHardware(vmmGObjectUI):
             prettyname = dev.pretty_name()
 
             if devtype == "pci":
-                for subdev in netdevs:
-                    if dev.xmlobj.name == subdev.xmlobj.parent:
-                        prettyname += " (%s)" % subdev.pretty_name()
+                for subdev in netdevs.get(dev.xmlobj.name, []):
+                    prettyname += " (%s)" % subdev.pretty_name()
 
             # parent device names are appended with mdev names in
             # libvirt 7.8.0
             if devtype == "mdev" and len(prettyname) <= 41:
-                for parentdev in self.conn.list_nodedevs():
-                    if dev.xmlobj.parent == parentdev.xmlobj.name:
-                        prettyname = "%s %s" % (
-                                parentdev.pretty_name(), prettyname)
+                parentdev = self.conn.get_nodedev_by_name(dev.xmlobj.parent)
+                if parentdev:
+                    prettyname = "%s %s" % (
+                            parentdev.pretty_name(), prettyname)
 
             tooltip = None
             sensitive = dev.is_active()
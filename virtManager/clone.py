@@ -347,6 +347,8 @@ class vmmCloneVM(vmmGObjectUI):
         # Populate default clone values
         cloner = self._build_cloner()
         cloner.prepare()
+        # This cloner is only used for default values
+        cloner.release_macs()
         self.widget("clone-orig-name").set_text(cloner.src_name)
         self.widget("clone-new-name").set_text(cloner.new_guest.name)
 
@@ -500,6 +502,7 @@ class vmmCloneVM(vmmGObjectUI):
         self.reset_finish_cursor()
 
         if error is not None:
+            cloner.release_macs()
             error = (_("Error creating virtual machine clone '%(vm)s': "
                        "%(error)s") % {
                      "vm": cloner.new_guest.name,
@@ -539,17 +542,22 @@ class vmmCloneVM(vmmGObjectUI):
         self._set_paths_from_clone_name()
 
         cloner = self._build_cloner()
-        for diskinfo in cloner.get_diskinfos():
-            target = diskinfo.disk.target
-            sinfo = self._storage_list[target]
-            sinfo.set_values_on_diskinfo(diskinfo)
+        try:
+            for diskinfo in cloner.get_diskinfos():
+                target = diskinfo.disk.target
+                sinfo = self._storage_list[target]
+                sinfo.set_values_on_diskinfo(diskinfo)
 
-        cloner.prepare()
-        for diskinfo in cloner.get_diskinfos():
-            diskinfo.raise_error()
+            cloner.prepare()
+            for diskinfo in cloner.get_diskinfos():
+                diskinfo.raise_error()
 
-        if self._validate(cloner) is False:
-            return
+            if self._validate(cloner) is False:
+                cloner.release_macs()
+                return
+        except Exception:
+            cloner.release_macs()
+            raise
         return cloner
 
     def _finish(self):
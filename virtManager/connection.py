@@ -41,8 +41,33 @@ class _ObjectList(vmmGObject):
         self._denylist = {}
         self._lock = threading.Lock()
 
+        # class -> {name: obj} and class -> {uuid: obj} lookup tables,
+        # plus id(obj) -> (name, uuid) for removing stale entries
+        self._names = {}
+        self._uuids = {}
+        self._keys = {}
+
     def _cleanup(self):
         self._objects = []
+        self._names = {}
+        self._uuids = {}
+        self._keys = {}
+
+    def _index_add(self, obj):
+        get_uuid = getattr(obj, "get_uuid", None)
+        name = obj.get_name()
+        uuid = get_uuid and get_uuid() or None
+        self._names.setdefault(obj.__class__, {})[name] = obj
+        if uuid:
+            self._uuids.setdefault(obj.__class__, {})[uuid] = obj
+        self._keys[id(obj)] = (name, uuid)
+
+    def _index_remove(self, obj):
+        name, uuid = self._keys.pop(id(obj))
+        for index, key in [(self._names, name), (self._uuids, uuid)]:
+            classindex = index.get(obj.__class__, {})
+            if classindex.get(key) is obj:
+                classindex.pop(key)
 
     def _denylist_key(self, obj):
         return str(obj.__class__) + obj.get_name()
@@ -93,6 +118,7 @@ class _ObjectList(vmmGObject):
                 return self.remove_denylist(obj)
 
             self._objects.remove(obj)
+            self._index_remove(obj)
             return True
 
     def add(self, obj):
@@ -108,14 +134,25 @@ class _ObjectList(vmmGObject):
             #
             # We don't use lookup_object here since we need to hold the
             # lock the whole time to prevent a 'time of check' issue
-            for checkobj in self._objects:
-                if (checkobj.__class__ == obj.__class__ and
-                    checkobj.get_name() == obj.get_name()):
-                    return False
+            if obj.get_name() in self._names.get(obj.__class__, {}):
+                return False
 
             self._objects.append(obj)
+            self._index_add(obj)
             return True
 
+    def update_name(self, obj):
+        """
+        Refresh the name lookup entry after obj changed its name
+
+        :param obj: vmmLibvirtObject that was renamed
+        """
+        with self._lock:
+            if id(obj) not in self._keys:
+                return
+            self._index_remove(obj)
+            self._index_add(obj)
+
     def get_objects_for_class(self, classobj):
         """
         Return all objects over the passed vmmLibvirtObject class
@@ -127,11 +164,15 @@ class _ObjectList(vmmGObject):
         """
         Lookup an object with the passed classobj + name
         """
-        # Doesn't require locking, since get_objects_for_class covers us
-        for obj in self.get_objects_for_class(classobj):
-            if obj.get_name() == name:
-                return obj
-        return None
+        with self._lock:
+            return self._names.get(classobj, {}).get(name)
+
+    def lookup_object_by_uuid(self, classobj, uuid):
+        """
+        Lookup an object with the passed classobj + UUID string
+        """
+        with self._lock:
+            return self._uuids.get(classobj, {}).get(uuid)
 
     def all_objects(self):
         with self._lock:
@@ -183,6 +224,16 @@ class vmmConnection(vmmGObject):
         self._xml_flags = {}
 
         self._objects = _ObjectList()
+        # Bumped whenever the XML objects we hand to the virtinst
+        # backend change, see xmlobjs_changed()
+        self._xmlobjs_generation = 0
+        # devtype -> (generation, filter_nodedevs result)
+        self._filter_nodedevs_cache = {}
+        # Bumped by pools when their volume list changes. The
+        # get_vol_by_path index is rebuilt when this or the pool
+        # list changes: (generation, pool ids, {path: vol})
+        self._volumes_generation = 0
+        self._vol_path_index = None
         self.statsmanager = vmmStatsManager()
 
         self._stats = []
@@ -277,6 +328,8 @@ class vmmConnection(vmmGObject):
                         log.debug("Fetching volume XML failed: %s", e)
             return ret
         self._backend.cb_fetch_all_vols = fetch_all_vols
+        self._backend.cb_fetch_generation = (
+            lambda: self._xmlobjs_generation)
 
         def cache_new_pool(obj):
             if not self.is_active():
@@ -454,22 +507,36 @@ class vmmConnection(vmmGObject):
     def get_default_pool(self):
         poolxml = virtinst.StoragePool.lookup_default_pool(self.get_backend())
         if poolxml:
-            for p in self.list_pools():
-                if p.get_name() == poolxml.name:
-                    return p
+            return self.get_pool_by_name(poolxml.name)
         return None
 
-    def get_vol_by_path(self, path):
-        for pool in self.list_pools():
+    def _build_vol_path_index(self, pools):
+        index = {}
+        for pool in pools:
             for vol in pool.get_volumes():
                 try:
-                    if vol.get_target_path() == path:
-                        return vol
+                    index.setdefault(vol.get_target_path(), vol)
                 except Exception as e:  # pragma: no cover
                     # Errors can happen if the volume disappeared, bug 1092739
-                    log.debug("Error looking up volume from path=%s: %s",
-                        path, e)
-        return None
+                    log.debug("Error looking up volume path for %s: %s",
+                        vol, e)
+        return index
+
+    def get_vol_by_path(self, path):
+        pools = self.list_pools()
+        for pool in pools:
+            # Repopulates volume lists dropped since the last call,
+            # which bumps _volumes_generation
+            pool.ensure_volumes()
+
+        poolids = [id(pool) for pool in pools]
+        cached = self._vol_path_index
+        if (not cached or cached[0] != self._volumes_generation or
+            cached[1] != poolids):
+            cached = (self._volumes_generation, poolids,
+                      self._build_vol_path_index(pools))
+            self._vol_path_index = cached
+        return cached[2].get(path)
 
 
     ###################################
@@ -504,6 +571,8 @@ class vmmConnection(vmmGObject):
 
     def get_vm_by_name(self, name):
         return self._objects.lookup_object(vmmDomain, name)
+    def get_vm_by_uuid(self, uuid):
+        return self._objects.lookup_object_by_uuid(vmmDomain, uuid)
     def list_vms(self):
         return self._objects.get_objects_for_class(vmmDomain)
 
@@ -528,6 +597,15 @@ class vmmConnection(vmmGObject):
     ############################
 
     def filter_nodedevs(self, devtype):
+        """
+        Return the vmmNodeDevice objects with the passed capability
+        type, or all of them if devtype is None. The result is cached
+        until xmlobjs_changed() is called
+        """
+        cached = self._filter_nodedevs_cache.get(devtype)
+        if cached and cached[0] == self._xmlobjs_generation:
+            return cached[1][:]
+
         retdevs = []
         for dev in self.list_nodedevs():
             try:
@@ -543,7 +621,10 @@ class vmmConnection(vmmGObject):
                 continue
 
             retdevs.append(dev)
-        return retdevs
+
+        self._filter_nodedevs_cache[devtype] = (
+                self._xmlobjs_generation, retdevs)
+        return retdevs[:]
 
 
     ###################################
@@ -557,6 +638,13 @@ class vmmConnection(vmmGObject):
     def define_pool(self, xml):
         return self._backend.storagePoolDefineXML(xml, 0)
 
+    def object_name_changed(self, obj):
+        """
+        Called by objects when get_name() changes, to keep the name
+        lookup table current
+        """
+        self._objects.update_name(obj)
+
     def rename_object(self, obj, origxml, newxml):
         if obj.is_domain():
             define_cb = self.define_domain
@@ -889,6 +977,7 @@ class vmmConnection(vmmGObject):
         self._backend.cb_fetch_all_pools = None
         self._backend.cb_fetch_all_nodedevs = None
         self._backend.cb_fetch_all_vols = None
+        self._backend.cb_fetch_generation = None
         self._backend.cb_cache_new_pool = None
 
         self.statsmanager.cleanup()
@@ -1015,6 +1104,23 @@ class vmmConnection(vmmGObject):
     # Tick/Update methods #
     #######################
 
+    def xmlobjs_changed(self):
+        """
+        Called when one of our objects, or a storage volume, is added,
+        removed, or gets a new or altered XML object. This lets the
+        virtinst backend know its cached, indexed copies of the
+        cb_fetch_all_* results are stale.
+        """
+        self._xmlobjs_generation += 1
+
+    def volumes_changed(self):
+        """
+        Called by a storage pool when volumes were added or removed, or
+        its volume list was dropped
+        """
+        self._volumes_generation += 1
+        self.xmlobjs_changed()
+
     def _remove_object_signal(self, obj):
         if obj.is_domain():
             self.emit("vm-removed", obj)
@@ -1044,6 +1150,7 @@ class vmmConnection(vmmGObject):
                 continue
 
             log.debug("%s=%s removed", class_name, name)
+            self.xmlobjs_changed()
             self._remove_object_signal(obj)
             obj.cleanup()
 
@@ -1067,6 +1174,7 @@ class vmmConnection(vmmGObject):
                 obj.cleanup()
                 return
 
+            self.xmlobjs_changed()
             if not obj.is_nodedev():
                 # Skip nodedev logging since it's noisy and not interesting
                 log.debug("%s=%s status=%s added", class_name,
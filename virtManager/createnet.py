@@ -154,18 +154,20 @@ class vmmCreateNetwork(vmmGObjectUI):
         # Populate hostdev forward devices
         devprettynames = []
         ifnames = []
+        netdevs = {}
+        for netdev in self.conn.filter_nodedevs("net"):
+            netdevs.setdefault(netdev.xmlobj.parent, netdev)
         for pcidev in self.conn.filter_nodedevs("pci"):
             if not pcidev.xmlobj.is_pci_sriov():
                 continue
             devdesc = pcidev.pretty_name()
-            for netdev in self.conn.filter_nodedevs("net"):
-                if pcidev.xmlobj.name != netdev.xmlobj.parent:
-                    continue
-                ifname = netdev.xmlobj.interface
-                devprettyname = "%s (%s)" % (ifname, devdesc)
-                devprettynames.append(devprettyname)
-                ifnames.append(ifname)
-                break
+            netdev = netdevs.get(pcidev.xmlobj.name)
+            if not netdev:
+                continue
+            ifname = netdev.xmlobj.interface
+            devprettyname = "%s (%s)" % (ifname, devdesc)
+            devprettynames.append(devprettyname)
+            ifnames.append(ifname)
 
         pf_model = self.widget("net-hostdevs").get_model()
         pf_model.clear()
@@ -189,6 +189,8 @@ class vmmCreateVM(vmmGObjectUI):
         self._capsinfo = None
 
         self._gdata = None
+        # MAC reserved on the connection by generate_mac
+        self._generated_mac = None
 
         # Distro detection state variables
         self._detect_os_in_progress = False
@@ -276,6 +278,11 @@ class vmmCreateVM(vmmGObjectUI):
         self._set_conn(None)
         self._gdata = None
 
+    def _release_generated_mac(self):
+        if self._generated_mac and self.conn:
+            self.conn.get_backend().release_mac(self._generated_mac)
+        self._generated_mac = None
+
     def _cleanup(self):
         if self._storage_browser:
             self._storage_browser.cleanup()
@@ -681,6 +688,8 @@ class vmmCreateVM(vmmGObjectUI):
         self.widget("startup-error-box").hide()
         self.widget("arch-warning-box").hide()
 
+        # Generated MACs are reserved on the old connection
+        self._release_generated_mac()
         oldconn = self.conn
         self.conn = newconn
         if oldconn:
@@ -1710,8 +1719,10 @@ class vmmCreateVM(vmmGObjectUI):
                 if not self._validate_storage_page():
                     return False  # pragma: no cover
 
+        self._release_generated_mac()
         macaddr = virtinst.DeviceInterface.generate_mac(
             self.conn.get_backend())
+        self._generated_mac = macaddr
 
         net = self._netlist.build_device(macaddr)
 
@@ -1933,11 +1944,7 @@ class vmmCreateVM(vmmGObjectUI):
             self._gdata.failed_guest = guest
             return
 
-        foundvm = None
-        for vm in self.conn.list_vms():
-            if vm.get_uuid() == guest.uuid:
-                foundvm = vm
-                break
+        foundvm = self.conn.get_vm_by_uuid(guest.uuid)
 
         self._close()
 
@@ -2013,9 +2020,7 @@ class vmmCreateVM(vmmGObjectUI):
         count = 0
         foundvm = None
         while count < 200:
-            for vm in self.conn.list_vms():
-                if vm.get_uuid() == guest.uuid:
-                    foundvm = vm
+            foundvm = self.conn.get_vm_by_uuid(guest.uuid)
             if foundvm:
                 break
             count += 1
@@ -1960,9 +1960,11 @@ class vmmDetails(vmmGObjectUI):
         self.widget("shared-memory").set_tooltip_text(shared_mem_err)
 
     def _refresh_disk_page(self, disk):
+        # Snapshot of all disk properties, shared with addstorage.set_dev
+        props = disk.get_props_snapshot()
         path = disk.get_source_path()
-        devtype = disk.device
-        bus = disk.bus
+        devtype = props.device
+        bus = props.bus
 
         size = "-"
         if path:
@@ -1982,13 +1984,14 @@ class vmmDetails(vmmGObjectUI):
         self.widget("disk-bus-label").set_text(
                 vmmAddHardware.disk_pretty_bus(bus) or "-")
 
-        is_removable = disk.is_cdrom() or disk.is_floppy()
+        is_floppy = devtype == disk.DEVICE_FLOPPY
+        is_removable = is_floppy or devtype == disk.DEVICE_CDROM
         self.widget("disk-source-box").set_visible(is_removable)
         self.widget("disk-source-label").set_visible(not is_removable)
 
         self.widget("disk-source-label").set_text(path or "-")
         if is_removable:
-            self._mediacombo.reset_state(is_floppy=disk.is_floppy())
+            self._mediacombo.reset_state(is_floppy=is_floppy)
             self._mediacombo.set_path(path or "")
 
         self._addstorage.set_dev(disk)
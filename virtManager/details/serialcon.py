@@ -5,6 +5,9 @@
 # See the COPYING file in the top-level directory.
 
 # pylint: disable=wrong-import-order,ungrouped-imports
+import collections
+import threading
+
 import gi
 from gi.repository import Gdk
 from gi.repository import Gtk
@@ -25,11 +28,84 @@ import libvirt
 from ..baseclass import vmmGObject
 
 
+# Max amount of guest output we queue up for the terminal. If the guest
+# writes faster than VTE can render, the oldest data is dropped
+STREAM_BUFFER_MAX = 4 * 1024 * 1024
+# Max amount of data fed to VTE in a single frame
+FEED_MAX = 256 * 1024
+# Feed interval in milliseconds, roughly one frame
+FEED_INTERVAL = 16
+
+
+class _RingBuffer(object):
+    """
+    Bounded FIFO of bytes chunks. Appending past maxsize discards
+    the oldest data and accounts for it in the dropped counter
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._chunks = collections.deque()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, data):
+        if len(data) >= self.maxsize:
+            self.dropped += self._size + len(data) - self.maxsize
+            self._chunks.clear()
+            self._size = 0
+            data = data[-self.maxsize:]
+
+        self._chunks.append(data)
+        self._size += len(data)
+
+        while self._size > self.maxsize:
+            over = self._size - self.maxsize
+            first = self._chunks[0]
+            if len(first) <= over:
+                self._chunks.popleft()
+                over = len(first)
+            else:
+                self._chunks[0] = first[over:]
+            self._size -= over
+            self.dropped += over
+
+    def pop(self, maxlen):
+        """
+        Remove and return up to maxlen bytes from the front of the buffer
+        """
+        ret = []
+        total = 0
+        while self._chunks and total < maxlen:
+            chunk = self._chunks.popleft()
+            want = maxlen - total
+            if len(chunk) > want:
+                self._chunks.appendleft(chunk[want:])
+                chunk = chunk[:want]
+            ret.append(chunk)
+            total += len(chunk)
+
+        self._size -= total
+        return b"".join(ret)
+
+    def pop_dropped(self):
+        ret = self.dropped
+        self.dropped = 0
+        return ret
+
+    def clear(self):
+        self._chunks.clear()
+        self._size = 0
+        self.dropped = 0
+
+
 class _DataStream(vmmGObject):
     """
     Wrapper class for interacting with libvirt console stream
     """
-    def __init__(self, vm):
+    def __init__(self, vm, buffer_max=STREAM_BUFFER_MAX):
         vmmGObject.__init__(self)
 
         self.vm = vm
@@ -37,8 +113,11 @@ class _DataStream(vmmGObject):
 
         self._stream = None
 
-        self._streamToTerminal = b""
+        self._lock = threading.Lock()
+        self._streamToTerminal = _RingBuffer(buffer_max)
         self._terminalToStream = ""
+        self._feed_id = None
+        self._total_dropped = 0
 
     def _cleanup(self):
         self.close()
@@ -51,12 +130,38 @@ class _DataStream(vmmGObject):
     # Internal APIs #
     #################
 
-    def _display_data(self, terminal):
-        if not self._streamToTerminal:
-            return  # pragma: no cover
+    def _schedule_display(self, terminal):
+        # Caller holds self._lock
+        if self._feed_id:
+            return
+        self._feed_id = self.timeout_add(FEED_INTERVAL,
+                self._display_data, terminal)
 
-        terminal.feed(self._streamToTerminal)
-        self._streamToTerminal = b""
+    def _unschedule_display(self):
+        # Caller holds self._lock
+        if self._feed_id:
+            self.remove_gobject_timeout(self._feed_id)
+            self._feed_id = None
+
+    def _display_data(self, terminal):
+        with self._lock:
+            # One shot timeout, drop it from the tracked handles
+            self._unschedule_display()
+            dropped = self._streamToTerminal.pop_dropped()
+            data = self._streamToTerminal.pop(FEED_MAX)
+            if len(self._streamToTerminal):
+                self._schedule_display(terminal)
+
+        if dropped:
+            self._total_dropped += dropped
+            log.debug("Console output too fast, dropped %d bytes "
+                      "(total=%d)", dropped, self._total_dropped)
+            msg = "\r\n" + (_("[%(bytes)d bytes of output dropped]") %
+                    {"bytes": dropped}) + "\r\n"
+            terminal.feed(msg.encode())
+        if data:
+            terminal.feed(data)
+        return False
 
     def _event_on_stream(self, stream, events, opaque):
         ignore = stream
@@ -84,10 +189,9 @@ class _DataStream(vmmGObject):
                 self.close()
                 return
 
-            queued_text = bool(self._streamToTerminal)
-            self._streamToTerminal += got
-            if not queued_text:
-                self.idle_add(self._display_data, terminal)
+            with self._lock:
+                self._streamToTerminal.append(got)
+                self._schedule_display(terminal)
 
         if (events & libvirt.VIR_EVENT_HANDLE_WRITABLE and
             self._terminalToStream):
@@ -148,6 +252,9 @@ class _DataStream(vmmGObject):
                 log.exception("Error finishing stream")
 
         self._stream = None
+        with self._lock:
+            self._unschedule_display()
+            self._streamToTerminal.clear()
 
     def send_data(self, src, text, length, terminal):
         """
@@ -4,10 +4,12 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import collections
 import datetime
 import glob
 import io
 import os
+import threading
 
 from gi.repository import GdkPixbuf
 from gi.repository import Gtk
@@ -53,6 +55,35 @@ def _make_screenshot_pixbuf(mime, sdata):
                                GdkPixbuf.InterpType.BILINEAR)
 
 
+class _ScreenshotCache(object):
+    """
+    LRU of scaled snapshot screenshot pixbufs. Entries are keyed by
+    filename and file mtime, so a rewritten screenshot is never served
+    stale
+    """
+    def __init__(self, maxitems):
+        self._maxitems = maxitems
+        self._lock = threading.Lock()
+        self._cache = collections.OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            pixbuf = self._cache.get(key)
+            if pixbuf is not None:
+                self._cache.move_to_end(key)
+            return pixbuf
+
+    def set(self, key, pixbuf):
+        with self._lock:
+            self._cache[key] = pixbuf
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._maxitems:
+                self._cache.popitem(last=False)
+
+
+_screenshot_cache = _ScreenshotCache(64)
+
+
 def _mime_to_ext(val, reverse=False):
     for m, e in mimemap.items():
         if val == m and not reverse:
@@ -72,6 +103,8 @@ class vmmSnapshotNew(vmmGObjectUI):
     def __init__(self, vm):
         vmmGObjectUI.__init__(self, "snapshotsnew.ui", "snapshot-new")
         self.vm = vm
+        self._screenshot_id = 0
+        self._screenshot_pending = False
 
         self._init_ui()
 
@@ -128,11 +161,17 @@ class vmmSnapshotNew(vmmGObjectUI):
         self.widget("snapshot-new-status-icon").set_from_icon_name(
             self.vm.run_status_icon_name(), Gtk.IconSize.BUTTON)
 
-        sn = self._get_screenshot()
+        # Screenshot is filled in asynchronously, see _screenshot_thread
+        self.widget("snapshot-new-screenshot").clear()
         uiutil.set_grid_row_visible(
-            self.widget("snapshot-new-screenshot"), bool(sn))
-        if sn:
-            self.widget("snapshot-new-screenshot").set_from_pixbuf(sn)
+            self.widget("snapshot-new-screenshot"), False)
+        self._screenshot_id += 1
+        self._screenshot_pending = self._can_screenshot()
+        self._update_ok_sensitive()
+        if self._screenshot_pending:
+            self._start_thread(self._screenshot_thread,
+                    "Snapshot screenshot %s" % self.vm.get_name(),
+                    args=[self._screenshot_id])
 
         self.widget("snapshot-new-name").grab_focus()
 
@@ -164,14 +203,35 @@ class vmmSnapshotNew(vmmGObjectUI):
             except Exception:  # pragma: no cover
                 pass
 
-    def _get_screenshot(self):
+    def _can_screenshot(self):
         if not self.vm.is_active():
             log.debug("Skipping screenshot since VM is not active")
-            return
+            return False
         if not self.vm.xmlobj.devices.graphics:
             log.debug("Skipping screenshot since VM has no graphics")
+            return False
+        return True
+
+    def _screenshot_thread(self, screenshot_id):
+        sn = None
+        try:
+            sn = self._get_screenshot()
+        finally:
+            # Always report back, Finish stays insensitive until we do
+            self.idle_add(self._screenshot_ready_cb, screenshot_id, sn)
+
+    def _screenshot_ready_cb(self, screenshot_id, sn):
+        if not self.vm or screenshot_id != self._screenshot_id:
+            # Dialog was closed or reset since we started
             return
+        self._screenshot_pending = False
+        self._update_ok_sensitive()
+        uiutil.set_grid_row_visible(
+            self.widget("snapshot-new-screenshot"), bool(sn))
+        if sn:
+            self.widget("snapshot-new-screenshot").set_from_pixbuf(sn)
 
+    def _get_screenshot(self):
         try:
             # Perform two screenshots, because qemu + qxl has a bug where
             # screenshot generally only shows the data from the previous
@@ -256,6 +316,8 @@ class vmmSnapshotNew(vmmGObjectUI):
             log.exception("Error saving screenshot")
 
     def _create_new_snapshot(self):
+        if self._screenshot_pending:
+            return  # pragma: no cover
         snap = self._validate_new_snapshot()
         if not snap:
             return
@@ -278,8 +340,20 @@ class vmmSnapshotNew(vmmGObjectUI):
     # UI listeners #
     ################
 
+    def _update_ok_sensitive(self):
+        # Don't allow Finish before the screenshot thread reports back,
+        # otherwise the snapshot is silently saved without a screenshot
+        name = self.widget("snapshot-new-name").get_text()
+        sensitive = bool(name) and not self._screenshot_pending
+        self.widget("snapshot-new-ok").set_sensitive(sensitive)
+        tooltip = None
+        if self._screenshot_pending:
+            tooltip = _("Waiting for the guest screenshot")
+        self.widget("snapshot-new-ok").set_tooltip_text(tooltip)
+
     def _name_changed_cb(self, src):
-        self.widget("snapshot-new-ok").set_sensitive(bool(src.get_text()))
+        ignore = src
+        self._update_ok_sensitive()
 
     def _ok_clicked_cb(self, src):
         return self._create_new_snapshot()
@@ -295,6 +369,7 @@ class vmmSnapshotPage(vmmGObjectUI):
         self._initial_populate = False
         self._unapplied_changes = False
         self._snapshot_new = None
+        self._screenshot_name = None
 
         self._snapmenu = None
         self._init_ui()
@@ -479,7 +554,7 @@ class vmmSnapshotPage(vmmGObjectUI):
 
         self._initial_populate = True
 
-    def _read_screenshot_file(self, name):
+    def _find_screenshot_file(self, name):
         if not name:
             return
 
@@ -488,12 +563,66 @@ class vmmSnapshotPage(vmmGObjectUI):
         files = glob.glob(basename + ".*")
         if not files:
             return
+        return files[0]
 
-        filename = files[0]
-        mime = _mime_to_ext(os.path.splitext(filename)[1][1:], reverse=True)
-        if not mime:
-            return  # pragma: no cover
-        return _make_screenshot_pixbuf(mime, open(filename, "rb").read())
+    def _show_screenshot(self, sn, loading=False):
+        label = _("No screenshot available")
+        if loading:
+            label = _("Loading screenshot...")
+        self.widget("snapshot-screenshot-label").set_text(label)
+        self.widget("snapshot-screenshot").set_visible(bool(sn))
+        self.widget("snapshot-screenshot-label").set_visible(not bool(sn))
+        if sn:
+            self.widget("snapshot-screenshot").set_from_pixbuf(sn)
+
+    def _load_screenshot(self, name):
+        """
+        Show the screenshot for snapshot 'name'. Scaled pixbufs come
+        from the LRU cache if possible, otherwise the file is decoded
+        in a thread and a placeholder is displayed in the meantime
+        """
+        self._screenshot_name = name
+        filename = self._find_screenshot_file(name)
+        if not filename:
+            self._show_screenshot(None)
+            return
+
+        try:
+            stat = os.stat(filename)
+        except OSError:  # pragma: no cover
+            self._show_screenshot(None)
+            return
+
+        key = (filename, stat.st_mtime_ns, stat.st_size)
+        sn = _screenshot_cache.get(key)
+        if sn:
+            self._show_screenshot(sn)
+            return
+
+        self._show_screenshot(None, loading=True)
+        self._start_thread(self._screenshot_thread,
+                "Snapshot screenshot %s" % name,
+                args=[name, filename, key])
+
+    def _screenshot_thread(self, name, filename, key):
+        sn = None
+        try:
+            mime = _mime_to_ext(os.path.splitext(filename)[1][1:],
+                                reverse=True)
+            if mime:
+                with open(filename, "rb") as fobj:
+                    sn = _make_screenshot_pixbuf(mime, fobj.read())
+                _screenshot_cache.set(key, sn)
+        except Exception:  # pragma: no cover
+            log.exception("Error reading screenshot %s", filename)
+
+        self.idle_add(self._screenshot_loaded_cb, name, sn)
+
+    def _screenshot_loaded_cb(self, name, sn):
+        if not self.vm or name != self._screenshot_name:
+            # Selection changed while we were loading
+            return
+        self._show_screenshot(sn)
 
     def _set_snapshot_state(self, snap=None):
         self.widget("snapshot-notebook").set_current_page(0)
@@ -540,11 +669,7 @@ class vmmSnapshotPage(vmmGObjectUI):
                 mode = _("External disk only")
             self.widget("snapshot-mode").set_text(mode)
 
-        sn = self._read_screenshot_file(name)
-        self.widget("snapshot-screenshot").set_visible(bool(sn))
-        self.widget("snapshot-screenshot-label").set_visible(not bool(sn))
-        if sn:
-            self.widget("snapshot-screenshot").set_from_pixbuf(sn)
+        self._load_screenshot(name)
 
         self.widget("snapshot-add").set_sensitive(True)
         self.widget("snapshot-delete").set_sensitive(bool(snap))
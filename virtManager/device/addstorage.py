@@ -293,14 +293,17 @@ class vmmAddStorage(vmmGObjectUI):
                 self.widget("disk-removable"), show_removable)
 
     def set_dev(self, disk):
-        cache = disk.driver_cache
-        discard = disk.driver_discard
-        ro = disk.read_only
-        share = disk.shareable
-        removable = bool(disk.removable)
-        serial = disk.serial
-
-        self.set_disk_bus(disk.bus)
+        # All properties, so the snapshot cached by the details disk
+        # page is reused
+        props = disk.get_props_snapshot()
+        cache = props.driver_cache
+        discard = props.driver_discard
+        ro = props.read_only
+        share = props.shareable
+        removable = bool(props.removable)
+        serial = props.serial
+
+        self.set_disk_bus(props.bus)
 
         uiutil.set_list_selection(self.widget("disk-cache"), cache)
         uiutil.set_list_selection(self.widget("disk-discard"), discard)
@@ -388,13 +388,13 @@ class vmmEngine(vmmGObject):
         if clistr.isdigit():
             clistr = int(clistr)
 
-        for vm in self._connobjs[uri].list_vms():
+        conn = self._connobjs[uri]
+        if not isinstance(clistr, int):
+            return conn.get_vm_by_name(clistr) or conn.get_vm_by_uuid(clistr)
+
+        for vm in conn.list_vms():
             if clistr == vm.get_id():
                 return vm
-            elif clistr == vm.get_name():
-                return vm
-            elif clistr == vm.get_uuid():
-                return vm
 
     def _cli_show_vm_helper(self, uri, clistr, page):
         vm = self._find_vm_by_cli_str(uri, clistr)
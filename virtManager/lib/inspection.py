@@ -3,6 +3,7 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import hashlib
 import queue
 import threading
 
@@ -13,6 +14,17 @@ from ..connmanager import vmmConnectionManager
 from ..object.domain import vmmInspectionApplication, vmmInspectionData
 
 
+# sha256 -> icon bytes. Guests running the same distro report the same
+# icon, keep only one copy of the data around
+_icon_data_cache = {}
+
+
+def _share_icon_data(icon):
+    if not icon:
+        return icon
+    return _icon_data_cache.setdefault(hashlib.sha256(icon).digest(), icon)
+
+
 def _inspection_error(_errstr):
     data = vmmInspectionData()
     data.errorstr = _errstr
@@ -177,7 +189,7 @@ def _perform_inspection(conn, vm):  # pragma: no cover
     data.hostname = str(hostname)
     data.product_name = str(product_name)
     data.product_variant = str(product_variant)
-    data.icon = icon
+    data.icon = _share_icon_data(icon)
     data.applications = list(apps or [])
     data.package_format = str(package_format)
 
@@ -0,0 +1,144 @@
+# This work is licensed under the GNU GPLv2 or later.
+# See the COPYING file in the top-level directory.
+
+# Simple startup profiler, invoked with virt-manager --profile-startup.
+# It times the first import of every module, plus named startup phases,
+# and builds a report once the first window has been shown.
+#
+# This module is imported before virtinst on purpose, so it must only
+# depend on the python stdlib.
+
+import builtins
+import contextlib
+import importlib.util
+import sys
+import threading
+import time
+
+
+_enabled = False
+_start_time = None
+_orig_import = None
+
+# module name -> [self time, cumulative time]
+_import_times = {}
+# Time spent in child imports, one entry per in progress import.
+# Threads can import concurrently, so every thread gets its own stack
+_import_state = threading.local()
+# list of (phase name, duration)
+_phases = []
+
+
+def _resolve_name(name, globals_, level):
+    if not level:
+        return name
+    package = (globals_ or {}).get("__package__")
+    if not package:
+        return None  # pragma: no cover
+    try:
+        return importlib.util.resolve_name("." * level + name, package)
+    except (ImportError, ValueError):  # pragma: no cover
+        return None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # pylint: disable=redefined-builtin
+    fullname = _resolve_name(name, globals, level)
+    candidates = []
+    if fullname and fullname not in sys.modules:
+        candidates.append(fullname)
+    elif fullname and fromlist:
+        # 'from gi.repository import Gtk' style submodule imports
+        candidates = [fullname + "." + sub for sub in fromlist
+                      if sub != "*" and fullname + "." + sub not in sys.modules]
+    if not candidates:
+        return _orig_import(name, globals, locals, fromlist, level)
+
+    import_stack = getattr(_import_state, "stack", None)
+    if import_stack is None:
+        import_stack = _import_state.stack = []
+    import_stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        total = time.perf_counter() - start
+        children = import_stack.pop()
+        if import_stack:
+            import_stack[-1] += total
+
+        # Skip fromlist entries that were plain attributes, not modules
+        loaded = [c for c in candidates if c in sys.modules]
+        key = ", ".join(loaded)
+        if key:
+            # setdefault is atomic, first recorder wins
+            _import_times.setdefault(key, [total - children, total])
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    """
+    Start recording import and phase times
+    """
+    global _enabled, _start_time, _orig_import
+    if _enabled:
+        return  # pragma: no cover
+    _enabled = True
+    _start_time = time.perf_counter()
+    _orig_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def disable():
+    global _enabled
+    if not _enabled:
+        return  # pragma: no cover
+    builtins.__import__ = _orig_import
+    _enabled = False
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Context manager recording the time spent in a named startup phase.
+    A no-op if profiling isn't enabled
+    """
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - start))
+
+
+def report(limit=40):
+    """
+    Stop profiling and return the report as a string
+    """
+    elapsed = time.perf_counter() - (_start_time or time.perf_counter())
+    disable()
+
+    lines = []
+    lines.append("Startup profile: %.1fms to first window" % (elapsed * 1000))
+
+    lines.append("")
+    lines.append("Phases:")
+    for name, duration in _phases:
+        lines.append("  %9.1fms  %s" % (duration * 1000, name))
+
+    lines.append("")
+    lines.append("Imports (top %d by self time, of %d):" %
+                 (limit, len(_import_times)))
+    lines.append("  %9s  %9s  %s" % ("self", "cumulative", "module"))
+    ordered = sorted(_import_times.items(),
+                     key=lambda item: item[1][0], reverse=True)
+    for modname, (selftime, cumtime) in ordered[:limit]:
+        lines.append("  %7.1fms  %8.1fms  %s" %
+                     (selftime * 1000, cumtime * 1000, modname))
+    return "\n".join(lines)
@@ -4,6 +4,10 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import hashlib
+import queue
+import threading
+
 from gi.repository import GObject
 from gi.repository import Gtk
 from gi.repository import Gdk
@@ -55,24 +59,73 @@ def _cmp(a, b):
     return ((a > b) - (a < b))
 
 
-def _get_inspection_icon_pixbuf(vm, w, h):
-    # libguestfs gives us the PNG data as a string.
-    png_data = vm.inspection.icon
-    if png_data is None:
-        return None
+class _InspectionIconCache(object):
+    """
+    Decodes and scales libguestfs inspection icons in a worker thread.
+    Scaled pixbufs are cached by hash of the icon data plus the requested
+    size, so VMs running the same distro share a single pixbuf
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (sha256, w, h) -> pixbuf, or None if decoding failed
+        self._cache = {}
+        # (sha256, w, h) -> [callbacks waiting on the result]
+        self._pending = {}
+        self._q = queue.Queue()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            key, png_data = self._q.get()
+            ignore, w, h = key
+            pixbuf = None
+            try:
+                pb = GdkPixbuf.PixbufLoader()
+                pb.set_size(w, h)
+                pb.write(png_data)
+                pb.close()
+                pixbuf = pb.get_pixbuf()
+            except Exception:  # pragma: no cover
+                log.exception("Error loading inspection icon data")
+
+            with self._lock:
+                self._cache[key] = pixbuf
+                callbacks = self._pending.pop(key, [])
+            for cb in callbacks:
+                vmmGObjectUI.idle_add(cb)
+
+    def lookup(self, png_data, w, h, cb):
+        """
+        Return the cached pixbuf for png_data scaled to w*h. If it isn't
+        decoded yet, return None and schedule cb() to be called from the
+        main loop once it is
+        """
+        if png_data is None:
+            return None
 
-    try:
-        pb = GdkPixbuf.PixbufLoader()
-        pb.set_size(w, h)
-        pb.write(png_data)
-        pb.close()
-        return pb.get_pixbuf()
-    except Exception:  # pragma: no cover
-        log.exception("Error loading inspection icon data")
-        vm.inspection.icon = None
+        key = (hashlib.sha256(png_data).digest(), w, h)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+            if key in self._pending:
+                self._pending[key].append(cb)
+                return None
+            self._pending[key] = [cb]
+
+            if not self._thread:
+                self._thread = threading.Thread(
+                        name="inspection icon thread", target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+        self._q.put((key, png_data))
         return None
 
 
+_inspection_icons = _InspectionIconCache()
+
+
 class vmmManager(vmmGObjectUI):
     @classmethod
     def get_instance(cls, parentobj):
@@ -611,7 +664,7 @@ class vmmManager(vmmGObjectUI):
             status_icon = vm.run_status_icon_name()
             hint = vm.get_description()
             color = None
-            os_icon = _get_inspection_icon_pixbuf(vm, 16, 16)
+            os_icon = self._lookup_inspection_icon(vm)
 
         row = []
         row.insert(ROW_HANDLE, conn or vm)
@@ -703,12 +756,19 @@ class vmmManager(vmmGObjectUI):
 
         self.vm_row_updated(vm)
 
+    def _lookup_inspection_icon(self, vm):
+        def _icon_ready_cb():
+            if self.builder:
+                self.vm_inspection_changed(vm)
+        return _inspection_icons.lookup(vm.inspection.icon, 16, 16,
+                _icon_ready_cb)
+
     def vm_inspection_changed(self, vm):
         row = self.get_row(vm)
         if row is None:
             return  # pragma: no cover
 
-        new_icon = _get_inspection_icon_pixbuf(vm, 16, 16)
+        new_icon = self._lookup_inspection_icon(vm)
         row[ROW_INSPECTION_OS_ICON] = new_icon
 
         self.vm_row_updated(vm)
@@ -510,6 +510,8 @@ class vmmDomain(vmmLibvirtObject):
 
     def _lookup_device_to_define(self, xmlobj, origdev, for_hotplug):
         if for_hotplug:
+            # origdev is from our cached xmlobj
+            self._xmlobj_edited_in_place()
             return origdev
 
         dev = xmlobj.find_device(origdev)
@@ -529,6 +531,9 @@ class vmmDomain(vmmLibvirtObject):
 
     def _process_device_define(self, editdev, xmlobj, do_hotplug):
         if do_hotplug:
+            # editdev was altered in place since _lookup_device_to_define,
+            # so make sure cached indexes over our xmlobj see the change
+            self.conn.xmlobjs_changed()
             self.hotplug(device=editdev)
         else:
             self._redefine_xmlobj(xmlobj)
@@ -1323,10 +1328,14 @@ class vmmDomain(vmmLibvirtObject):
             return title
         return self.get_name()
 
+    def _get_summary_props(self):
+        # The manager refreshes every row often, the snapshot is cached
+        # until the XML changes
+        return self.get_xmlobj().get_props_snapshot(["title", "description"])
     def get_title(self):
-        return self.get_xmlobj().title
+        return self._get_summary_props().title
     def get_description(self):
-        return self.get_xmlobj().description
+        return self._get_summary_props().description
 
     def get_boot_order(self):
         legacy = not self.can_use_device_boot_order()
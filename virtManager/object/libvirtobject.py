@@ -31,6 +31,9 @@ class vmmLibvirtObject(vmmGObject):
 
         self._xmlobj = None
         self._xmlobj_to_define = None
+        # Raw XML that _xmlobj was parsed from, so a refresh returning
+        # identical XML can skip reparsing
+        self._xmlobj_rawxml = None
         self._is_xml_valid = False
 
         # These should be set by the child classes if necessary
@@ -122,9 +125,11 @@ class vmmLibvirtObject(vmmGObject):
 
         try:
             self._name = newname
+            self.conn.object_name_changed(self)
             self.conn.rename_object(self, origxml, newxml)
         except Exception:  # pragma: no cover
             self._name = oldname
+            self.conn.object_name_changed(self)
             raise
         finally:
             self.__force_refresh_xml()
@@ -286,12 +291,15 @@ class vmmLibvirtObject(vmmGObject):
         """
         origxml = None
         if self._xmlobj:
-            origxml = self._xmlobj.get_xml()
+            origxml = self._xmlobj_rawxml
 
         self._invalidate_xml()
         active_xml = self._XMLDesc(self._active_xml_flags)
-        self._xmlobj = self._parseclass(self.conn.get_backend(),
-            parsexml=active_xml)
+        if self._xmlobj is None or active_xml != self._xmlobj_rawxml:
+            self._xmlobj = self._parseclass(self.conn.get_backend(),
+                parsexml=active_xml)
+            self._xmlobj_rawxml = active_xml
+            self.conn.xmlobjs_changed()
         self._is_xml_valid = True
 
         if not nosignal and origxml != active_xml:
@@ -360,6 +368,14 @@ class vmmLibvirtObject(vmmGObject):
         # _name, the XML is never invalid.
         self._is_xml_valid = self._using_events()
 
+    def _xmlobj_edited_in_place(self):
+        """
+        Called when the cached xmlobj is about to be altered by the
+        caller, so the next refresh reparses even if the XML is unchanged
+        """
+        self._xmlobj_rawxml = None
+        self.conn.xmlobjs_changed()
+
     def _make_xmlobj_to_define(self):
         """
         Build an xmlobj that should be used for defining new XML.
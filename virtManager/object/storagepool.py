@@ -68,9 +68,7 @@ class vmmStorageVolume(vmmLibvirtObject):
 
     def get_parent_pool(self):
         name = self._backend.storagePoolLookupByVolume().name()
-        for pool in self.conn.list_pools():
-            if pool.get_name() == name:
-                return pool
+        return self.conn.get_pool_by_name(name)
 
     def delete(self, force=True):
         ignore = force
@@ -144,6 +142,7 @@ class vmmStoragePool(vmmLibvirtObject):
 
         self._last_refresh_time = 0
         self._volumes = None
+        self._volume_names = {}
 
 
     ##########################
@@ -241,17 +240,26 @@ class vmmStoragePool(vmmLibvirtObject):
     ###################
 
     def get_volume_by_name(self, name):
-        for vol in self.get_volumes():
-            if vol.get_name() == name:
-                return vol
+        self._update_volumes(force=False)
+        return self._volume_names.get(name)
 
     def get_volumes(self):
         self._update_volumes(force=False)
         return self._volumes[:]
 
+    def ensure_volumes(self):
+        """
+        Repopulate the volume list if it was dropped, without the cost
+        of copying it like get_volumes does
+        """
+        self._update_volumes(force=False)
+
     def _update_volumes(self, force):
         if not self.is_active():
+            if self._volumes:
+                self.conn.volumes_changed()
             self._volumes = []
+            self._volume_names = {}
             return
         if not force and self._volumes is not None:
             return
@@ -259,9 +267,12 @@ class vmmStoragePool(vmmLibvirtObject):
         keymap = dict((o.get_name(), o) for o in self._volumes or [])
         def cb(obj, key):
             return vmmStorageVolume(self.conn, obj, key)
-        (dummy1, dummy2, allvols) = pollhelpers.fetch_volumes(
+        (gone, new, allvols) = pollhelpers.fetch_volumes(
             self.conn.get_backend(), self.get_backend(), keymap, cb)
         self._volumes = allvols
+        self._volume_names = dict((o.get_name(), o) for o in allvols)
+        if gone or new:
+            self.conn.volumes_changed()
 
 
     #########################
@@ -3,18 +3,86 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import threading
+
 from gi.repository import Gdk, Gtk
 
 import virtinst
+from virtinst import log
 from virtinst import xmlutil
 
-from .baseclass import vmmGObjectUI
+from .baseclass import vmmGObject, vmmGObjectUI
 
 
 def _always_show(osobj):
     return bool(osobj.is_generic() or osobj.is_linux_generic())
 
 
+class _OSListCache(object):
+    """
+    Process wide cache of the OS list rows. Building the list walks the
+    whole libosinfo DB, so do it once in a background thread and share
+    the result with every vmmOSList instance. The DB itself is loaded
+    on the main thread first, the thread only wraps and sorts the
+    already loaded OS objects.
+
+    Each row is: (os object, label, eol, always_show, search text)
+    """
+    _lock = threading.Lock()
+    _rows = None
+    _thread = None
+    _callbacks = []
+
+    @staticmethod
+    def _build_rows():
+        all_os = virtinst.OSDB.list_os(sortkey="label")
+        # Always put the generic entries at the end of the list
+        all_os = list(sorted(all_os, key=_always_show))
+
+        rows = []
+        for osobj in all_os:
+            search = "%s\n%s" % (osobj.label.lower(), osobj.name.lower())
+            rows.append((osobj, "%s (%s)" % (osobj.label, osobj.name),
+                bool(osobj.eol), _always_show(osobj), search))
+        return rows
+
+    @classmethod
+    def _thread_cb(cls):
+        try:
+            rows = cls._build_rows()
+        except Exception:  # pragma: no cover
+            log.exception("Error building OS list")
+            rows = []
+
+        with cls._lock:
+            cls._rows = rows
+            callbacks = cls._callbacks[:]
+            cls._callbacks = []
+            cls._thread = None
+
+        for cb in callbacks:
+            vmmGObject.idle_add(cb, rows)
+
+    @classmethod
+    def get_rows(cls, cb):
+        """
+        Call cb(rows) from the main loop once the rows are available.
+        If they are already cached, cb is invoked immediately
+        """
+        with cls._lock:
+            rows = cls._rows
+            if rows is None:
+                cls._callbacks.append(cb)
+                if not cls._thread:
+                    virtinst.OSDB.load()
+                    cls._thread = threading.Thread(
+                            target=cls._thread_cb, name="OS list thread")
+                    cls._thread.daemon = True
+                    cls._thread.start()
+        if rows is not None:
+            cb(rows)
+
+
 class vmmOSList(vmmGObjectUI):
     __gsignals__ = {
         "os-selected": (vmmGObjectUI.RUN_FIRST, None, [object])
@@ -27,6 +95,8 @@ class vmmOSList(vmmGObjectUI):
         self._filter_name = None
         self._filter_eol = True
         self._selected_os = None
+        self._pending_select_os = None
+        self._os_list_model = None
         self.search_entry = self.widget("os-name")
         self.search_entry.set_placeholder_text(_("Type to start searching..."))
         self.eol_text = self.widget("eol-warn").get_text()
@@ -44,7 +114,7 @@ class vmmOSList(vmmGObjectUI):
         self._init_state()
 
     def _cleanup(self):
-        pass
+        self._os_list_model = None
 
 
     ###########
@@ -54,17 +124,10 @@ class vmmOSList(vmmGObjectUI):
     def _init_state(self):
         os_list = self.widget("os-list")
 
-        # (os object, label)
-        os_list_model = Gtk.ListStore(object, str)
+        # (os object, label, eol, always show, search text)
+        self._os_list_model = Gtk.ListStore(object, str, bool, bool, str)
 
-        all_os = virtinst.OSDB.list_os(sortkey="label")
-        # Always put the generic entries at the end of the list
-        all_os = list(sorted(all_os, key=_always_show))
-
-        for os in all_os:
-            os_list_model.append([os, "%s (%s)" % (os.label, os.name)])
-
-        model_filter = Gtk.TreeModelFilter(child_model=os_list_model)
+        model_filter = Gtk.TreeModelFilter(child_model=self._os_list_model)
         model_filter.set_visible_func(self._filter_os_cb)
 
         os_list.set_model(model_filter)
@@ -81,6 +144,26 @@ class vmmOSList(vmmGObjectUI):
                 self.widget("eol-warn").get_text())
         self.widget("eol-warn").set_markup(markup)
 
+        _OSListCache.get_rows(self._os_rows_ready_cb)
+
+    def _os_rows_ready_cb(self, rows):
+        if not self._os_list_model:
+            return  # pragma: no cover
+
+        # Detach the model while filling it, so the filter and the
+        # treeview aren't updated for every single row
+        os_list = self.widget("os-list")
+        model_filter = os_list.get_model()
+        os_list.set_model(None)
+        for row in rows:
+            self._os_list_model.append(row)
+        os_list.set_model(model_filter)
+
+        if self._pending_select_os:
+            vmosobj = self._pending_select_os
+            self._pending_select_os = None
+            self.select_os(vmosobj)
+
 
     ###################
     # Private helpers #
@@ -186,19 +269,16 @@ class vmmOSList(vmmGObjectUI):
         self._sync_os_selection()
 
     def _filter_os_cb(self, model, titer, ignore1):
-        osobj = model.get(titer, 0)[0]
+        eol, always_show, search = model.get(titer, 2, 3, 4)
         if self._filter_eol:
-            if osobj.eol:
+            if eol:
                 return False
 
-        if _always_show(osobj):
+        if always_show:
             return True
 
-        if self._filter_name is not None and self._filter_name != "":
-            label = osobj.label.lower()
-            name = osobj.name.lower()
-            if (label.find(self._filter_name) == -1 and
-                name.find(self._filter_name) == -1):
+        if self._filter_name:
+            if self._filter_name not in search:
                 return False
 
         return True
@@ -210,11 +290,17 @@ class vmmOSList(vmmGObjectUI):
 
     def reset_state(self):
         self._selected_os = None
+        self._pending_select_os = None
         self.search_entry.set_text("")
         self._clear_filter()
         self._sync_os_selection()
 
     def select_os(self, vmosobj):
+        if not len(self._os_list_model):
+            # OS list is still being built in the background
+            self._pending_select_os = vmosobj
+            return
+
         self._clear_filter()
 
         os_list = self.widget("os-list")
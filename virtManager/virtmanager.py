@@ -4,12 +4,19 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+# pylint: disable=wrong-import-position
+
 import argparse
 import os
 import signal
 import sys
 import traceback
 
+# Must come before any heavy imports, so they are included in the report
+from .lib import startup_profile
+if "--profile-startup" in sys.argv:
+    startup_profile.enable()
+
 import gi
 gi.require_version("Gdk", "3.0")
 gi.require_version("Gtk", "3.0")
@@ -17,8 +24,8 @@ gi.require_version('LibvirtGLib', '1.0')
 from gi.repository import LibvirtGLib
 
 from virtinst import BuildConfig
-from virtinst import cli
 from virtinst import log
+from virtinst.logger import setup_logging
 
 from .lib.testmock import CLITestOptionsClass
 
@@ -142,6 +149,9 @@ def parse_commandline():
         default=False)
     parser.add_argument("--no-fork", action="store_true",
         help="Don't fork into background on startup")
+    parser.add_argument("--profile-startup", action="store_true",
+        help="Print import and initialization times after the first "
+             "window is shown (implies --no-fork)")
 
     parser.add_argument("--show-domain-creator", action="store_true",
         help="Show 'New VM' wizard")
@@ -159,10 +169,19 @@ def parse_commandline():
     return parser.parse_known_args()
 
 
+def _report_startup_profile():
+    report = startup_profile.report()
+    log.debug("%s", report)
+    print(report, file=sys.stderr)
+    return False
+
+
 def main():
-    (options, leftovers) = parse_commandline()
+    with startup_profile.phase("parse command line"):
+        (options, leftovers) = parse_commandline()
 
-    cli.setupLogging("virt-manager", options.debug, False, False)
+    with startup_profile.phase("setup logging"):
+        setup_logging("virt-manager", options.debug, False, False)
 
     log.debug("virt-manager version: %s", BuildConfig.version)
     log.debug("virtManager import: %s", os.path.dirname(__file__))
@@ -185,14 +204,17 @@ def main():
 
     # Now we've got basic environment up & running we can fork
     do_drop_stdio = False
-    if not options.no_fork and not options.debug:
+    if (not options.no_fork and
+        not options.debug and
+        not options.profile_startup):
         drop_tty()
         do_drop_stdio = True
 
         # Ignore SIGHUP, otherwise a serial console closing drops the whole app
         signal.signal(signal.SIGHUP, signal.SIG_IGN)
 
-    leftovers = _import_gtk(leftovers)
+    with startup_profile.phase("import and init gtk"):
+        leftovers = _import_gtk(leftovers)
     Gtk = globals()["Gtk"]
 
     # Do this after the Gtk import so the user has a chance of seeing any error
@@ -212,14 +234,16 @@ def main():
                   Gtk.get_micro_version())
 
     # Prime the vmmConfig cache
-    from . import config
-    config.vmmConfig.get_instance(BuildConfig, CLITestOptions)
+    with startup_profile.phase("init config"):
+        from . import config
+        config.vmmConfig.get_instance(BuildConfig, CLITestOptions)
 
     # Add our icon dir to icon theme
     icon_theme = Gtk.IconTheme.get_default()
     icon_theme.prepend_search_path(BuildConfig.icon_dir)
 
-    from .engine import vmmEngine
+    with startup_profile.phase("import engine"):
+        from .engine import vmmEngine
     Gtk.Window.set_default_icon_name("virt-manager")
 
     show_window = None
@@ -252,10 +276,14 @@ def main():
     LibvirtGLib.init(None)
     LibvirtGLib.event_register()
 
-    engine = vmmEngine.get_instance()
+    with startup_profile.phase("init engine"):
+        engine = vmmEngine.get_instance()
 
     # Actually exit when we receive ctrl-c
     from gi.repository import GLib
+    if startup_profile.is_enabled():
+        # Low priority idle runs after the first window is mapped and drawn
+        GLib.idle_add(_report_startup_profile, priority=GLib.PRIORITY_LOW)
     def _sigint_handler(user_data):
         ignore = user_data
         log.debug("Received KeyboardInterrupt. Exiting application.")
@@ -24,10 +24,11 @@ from .connection import VirtinstConnection
 from .devices import (Device, DeviceController, DeviceDisk, DeviceGraphics,
         DeviceHostdev, DeviceInterface, DevicePanic)
 from .guest import Guest
-from .logger import log, reset_logging
+from .logger import log, reset_logging, setup_logging
 from .nodedev import NodeDevice
 from .osdict import OSDB
 from .storage import StoragePool, StorageVolume
+from .xmlbuilder import XMLProperty
 from .install.unattended import UnattendedData
 from .install.cloudinit import CloudInitData
 
@@ -128,81 +129,7 @@ def earlyLogging():
 def setupLogging(appname, debug_stdout, do_quiet, cli_app=True):
     _reset_global_state()
     get_global_state().quiet = do_quiet
-
-    vi_dir = VirtinstConnection.get_app_cache_dir()
-    logfile = os.path.join(vi_dir, appname + ".log")
-    if xmlutil.in_testsuite():
-        vi_dir = None
-        logfile = None
-
-    try:  # pragma: no cover
-        if vi_dir and not os.access(vi_dir, os.W_OK):
-            if os.path.exists(vi_dir):
-                raise RuntimeError("No write access to directory %s" % vi_dir)
-
-            try:
-                os.makedirs(vi_dir, 0o751)
-            except IOError as e:
-                raise RuntimeError("Could not create directory %s: %s" %
-                                   (vi_dir, e)) from None
-
-        if (logfile and
-            os.path.exists(logfile) and
-            not os.access(logfile, os.W_OK)):
-            raise RuntimeError("No write access to logfile %s" % logfile)
-    except Exception as e:  # pragma: no cover
-        log.warning("Error setting up logfile: %s", e)
-        logfile = None
-
-    dateFormat = "%a, %d %b %Y %H:%M:%S"
-    fileFormat = ("[%(asctime)s " + appname + " %(process)d] "
-                  "%(levelname)s (%(module)s:%(lineno)d) %(message)s")
-    streamErrorFormat = "%(levelname)-8s %(message)s"
-
-    import logging
-    import logging.handlers
-    reset_logging()
-
-    log.setLevel(logging.DEBUG)
-    if logfile:
-        fileHandler = logging.handlers.RotatingFileHandler(
-            logfile, "ae", 1024 * 1024, 5)
-        fileHandler.setFormatter(
-            logging.Formatter(fileFormat, dateFormat))
-        log.addHandler(fileHandler)
-
-    streamHandler = logging.StreamHandler(sys.stderr)
-    if debug_stdout:
-        streamHandler.setLevel(logging.DEBUG)
-        streamHandler.setFormatter(logging.Formatter(fileFormat,
-                                                     dateFormat))
-    elif cli_app or not logfile:
-        # Have cli tools show WARN/ERROR by default
-        if get_global_state().quiet:
-            level = logging.ERROR
-        else:
-            level = logging.WARN
-        streamHandler.setLevel(level)
-        streamHandler.setFormatter(logging.Formatter(streamErrorFormat))
-    else:  # pragma: no cover
-        streamHandler = None
-
-    if streamHandler:
-        log.addHandler(streamHandler)
-
-    # Log uncaught exceptions
-    def exception_log(typ, val, tb):  # pragma: no cover
-        log.debug("Uncaught exception:\n%s",
-                      "".join(traceback.format_exception(typ, val, tb)))
-        if not debug_stdout:
-            # If we are already logging to stdout, don't double print
-            # the backtrace
-            sys.__excepthook__(typ, val, tb)
-    sys.excepthook = exception_log
-
-    # Log the app command string
-    log.debug("Version %s launched with command line: %s",
-              BuildConfig.version, " ".join(sys.argv))
+    setup_logging(appname, debug_stdout, do_quiet, cli_app=cli_app)
 
 
 ##############################
@@ -1119,6 +1046,8 @@ class _VirtCLIArgument(object):
         self.val = val
         self.key = key
         self._virtarg = virtarg
+        # XMLProperty -> self.val converted by that property, for lookups
+        self._lookup_vals = {}
 
         # For convenience
         self.propname = virtarg.propname
@@ -1180,12 +1109,25 @@ class _VirtCLIArgument(object):
                                            inst, self.val, self)
 
         # To reliably compare between CLI style values and internal
-        # XML API values, we need to set the CLI value on a copy of the
-        # object we are checking, read back the result, and compare with that
+        # XML API values, we need to convert the CLI value the same way
+        # setting it on the object would. For XMLProperty that's done
+        # once per argument with the property converters. Anything else
+        # needs the value set on a copy of the object and read back.
         xmlval = xmlutil.get_prop_path(inst, self.propname)
-        setter = inst.__class__(inst.conn, parsexml=inst.get_xml())
-        xmlutil.set_prop_path(setter, self.propname, self.val)
-        clival = xmlutil.get_prop_path(setter, self.propname)
+        pieces = self.propname.split(".")
+        parent = inst
+        for piece in pieces[:-1]:
+            parent = getattr(parent, piece)
+        prop = getattr(type(parent), pieces[-1], None)
+
+        if isinstance(prop, XMLProperty):
+            if prop not in self._lookup_vals:
+                self._lookup_vals[prop] = prop.convert_value(self.val)
+            clival = self._lookup_vals[prop]
+        else:
+            setter = inst.__class__(inst.conn, parsexml=inst.get_xml())
+            xmlutil.set_prop_path(setter, self.propname, self.val)
+            clival = xmlutil.get_prop_path(setter, self.propname)
         return xmlval == clival
 
 
@@ -1562,12 +1504,18 @@ class VirtCLIParser(metaclass=_InitClass):
         """
         ret = []
         objlist = xmlutil.listify(self.lookup_prop(self.guest))
+        if not objlist:
+            return ret
 
+        inst = None
         try:
+            # Build the arguments once, so they can reuse their
+            # converted lookup values across every object
+            optdict = self.optdict.copy()
+            params = self._optdict_to_param_list(optdict)
             for inst in objlist:
-                optdict = self.optdict.copy()
                 valid = True
-                for param in self._optdict_to_param_list(optdict):
+                for param in params:
                     paramret = param.lookup_param(self, inst)
                     if paramret is False:
                         valid = False
@@ -4727,7 +4675,10 @@ def _AddressStringToNodedev(conn, addrstr):
     count = 0
     nodedev = None
 
-    for xmlobj in conn.fetch_all_nodedevs():
+    # compare_to_hostdev only matches pci and usb_device nodedevs here
+    devtype = (hostdev.type == "pci" and NodeDevice.CAPABILITY_TYPE_PCI or
+               NodeDevice.CAPABILITY_TYPE_USBDEV)
+    for xmlobj in conn.fetch_nodedevs_by_type(devtype):
         if xmlobj.compare_to_hostdev(hostdev):
             nodedev = xmlobj
             count += 1
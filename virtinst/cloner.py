@@ -64,9 +64,8 @@ def _generate_clone_name(conn, basename):
             start_num = int(str(num_match.group())) + 1
         basename = basename[:match.start()]
 
-    def cb(n):
-        return generatename.check_libvirt_collision(
-            conn.lookupByName, n)
+    cb = generatename.libvirt_names_collision_cb(
+            conn.listAllDomains, conn.lookupByName)
     basename = basename + "-clone"
     return generatename.generate_name(basename, cb,
             sep="", start_num=start_num, force_num=force_num)
@@ -302,6 +301,7 @@ class Cloner(object):
         self._new_guest = None
         self._diskinfos = []
         self._nvram_diskinfo = None
+        self._generated_macs = []
         self._init_src(src_name, src_xml)
 
         self._new_nvram_path = None
@@ -362,9 +362,12 @@ class Cloner(object):
                                "in order to avoid conflicting."))
                 dev.port = -1
 
-        for iface in self._new_guest.devices.interface:
+        ifaces = self._new_guest.devices.interface
+        macs = DeviceInterface.generate_macs(self.conn, len(ifaces))
+        self._generated_macs = [mac for mac in macs if mac]
+        for iface, mac in zip(ifaces, macs):
             iface.target_dev = None
-            iface.macaddr = DeviceInterface.generate_mac(self.conn)
+            iface.macaddr = mac
 
         # For guest agent channel, remove a path to generate a new one with
         # new guest name
@@ -401,6 +404,16 @@ class Cloner(object):
     def nvram_diskinfo(self):
         return self._nvram_diskinfo
 
+    def release_macs(self):
+        """
+        Release the MACs reserved for the new guest's interfaces, for
+        when the clone is abandoned. Defining the clone releases them
+        automatically
+        """
+        for mac in self._generated_macs:
+            self.conn.release_mac(mac)
+        self._generated_macs = []
+
     def set_clone_name(self, name):
         self._new_guest.name = name
 
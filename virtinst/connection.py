@@ -4,7 +4,10 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import concurrent.futures
 import os
+import threading
+import time
 import weakref
 
 import libvirt
@@ -12,10 +15,12 @@ import libvirt
 from . import Capabilities
 from . import pollhelpers
 from . import support
+from . import xmlapi
 from . import xmlutil
 from .guest import Guest
+from .hostcache import HostCache
 from .logger import log
-from .nodedev import NodeDevice
+from .nodedev import NodeDeviceRecord
 from .storage import StoragePool, StorageVolume
 from .uri import URI, MagicURI
 
@@ -31,6 +36,120 @@ def _real_local_libvirt_version():
     return getattr(libvirt, key)
 
 
+def _get_default_host_cache_dir():
+    if not os.environ.get("VIRTINST_HOST_CACHE"):
+        return None
+    return os.path.join(VirtinstConnection.get_app_cache_dir(), "hostcache")
+
+
+def _get_default_fetch_concurrency():
+    val = os.environ.get("VIRTINST_FETCH_CONCURRENCY", "")
+    try:
+        return max(int(val), 1)
+    except ValueError:
+        return 4
+
+
+class _FetchCacheEntry(object):
+    """
+    One cached fetch_all_* object list, plus secondary indexes over it
+    that are built on first use, and updated incrementally when the
+    object list changes
+
+    Not thread safe by itself: all access goes through
+    VirtinstConnection while holding its _fetch_lock
+    """
+    def __init__(self, objs):
+        self.objs = objs
+        self.timestamp = time.monotonic()
+        # Opaque value from VirtinstConnection.cb_fetch_generation
+        self.generation = None
+        # indexname -> (value -> [obj, ...], id(obj) -> values, valuecb)
+        self._indexes = {}
+        self._positions = None
+
+    def is_expired(self, ttl):
+        return ttl is not None and time.monotonic() - self.timestamp > ttl
+
+    def _index_add(self, indexname, obj):
+        index, objvalues, valuecb = self._indexes[indexname]
+        values = [v for v in valuecb(obj) if v]
+        objvalues[id(obj)] = values
+        for value in values:
+            objlist = index.setdefault(value, [])
+            if not objlist or objlist[-1] is not obj:
+                objlist.append(obj)
+
+    def _index_remove(self, indexname, obj):
+        index, objvalues, dummy = self._indexes[indexname]
+        for value in objvalues.pop(id(obj), []):
+            objlist = [o for o in index.get(value, []) if o is not obj]
+            if objlist:
+                index[value] = objlist
+            else:
+                index.pop(value, None)
+
+    def _index_refresh(self, indexname, obj):
+        # The object may have been edited in place, so recompute its
+        # values and only touch the index if they changed
+        dummy, objvalues, valuecb = self._indexes[indexname]
+        values = [v for v in valuecb(obj) if v]
+        if values != objvalues.get(id(obj)):
+            self._index_remove(indexname, obj)
+            self._index_add(indexname, obj)
+
+    def update_objs(self, newobjs):
+        """
+        Replace the object list with newobjs. Objects are matched by
+        identity: added and removed ones are indexed and unindexed, and
+        the values of retained ones are recomputed, since their XML
+        objects can be altered in place
+        """
+        oldids = set(id(obj) for obj in self.objs)
+        newids = set(id(obj) for obj in newobjs)
+        removed = [obj for obj in self.objs if id(obj) not in newids]
+        added = [obj for obj in newobjs if id(obj) not in oldids]
+        retained = [obj for obj in newobjs if id(obj) in oldids]
+
+        for indexname in self._indexes:
+            for obj in removed:
+                self._index_remove(indexname, obj)
+            for obj in retained:
+                self._index_refresh(indexname, obj)
+            for obj in added:
+                self._index_add(indexname, obj)
+        self.objs = newobjs
+        self._positions = None
+
+    def _get_index(self, indexname, valuecb):
+        if indexname not in self._indexes:
+            self._indexes[indexname] = ({}, {}, valuecb)
+            for obj in self.objs:
+                self._index_add(indexname, obj)
+        return self._indexes[indexname][0]
+
+    def lookup(self, indexname, valuecb, values):
+        """
+        Return all objects matching any of the passed index values,
+        in the original fetch order
+        """
+        index = self._get_index(indexname, valuecb)
+        ret = []
+        seen = set()
+        for value in values:
+            for obj in index.get(value, []):
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    ret.append(obj)
+
+        if len(ret) > 1:
+            if self._positions is None:
+                self._positions = dict(
+                        (id(obj), idx) for idx, obj in enumerate(self.objs))
+            ret.sort(key=lambda obj: self._positions[id(obj)])
+        return ret
+
+
 class VirtinstConnection(object):
     """
     Wrapper for libvirt connection that provides various bits like
@@ -75,8 +194,23 @@ class VirtinstConnection(object):
         self._libvirtconn = None
         self._uriobj = URI(self._uri)
         self._caps = None
+        self._host_cache = None
+        self._reserved_macs = set()
+
+        # (emulator, arch, machine, hvtype) -> DomainCapabilities, see
+        # DomainCapabilities.build_from_params
+        self.domcaps_cache = {}
+
+        # Directory for the on disk HostCache. None disables it. Opt-in,
+        # by setting VIRTINST_HOST_CACHE=1 in the environment
+        self.host_cache_dir = _get_default_host_cache_dir()
 
         self._fetch_cache = {}
+        # virt-manager calls into us from worker threads while the main
+        # loop uses the same connection. This serializes building,
+        # updating and indexing the fetch cache entries. Reentrant since
+        # fetching volumes fetches pools
+        self._fetch_lock = threading.RLock()
 
         # These let virt-manager register a callback which provides its
         # own cached object lists, rather than doing fresh calls
@@ -85,6 +219,20 @@ class VirtinstConnection(object):
         self.cb_fetch_all_vols = None
         self.cb_fetch_all_nodedevs = None
         self.cb_cache_new_pool = None
+        # Optional callback returning a value that changes whenever any
+        # object returned by the cb_fetch_all_* callbacks is added,
+        # removed or replaced. When set, the callback results are cached
+        # and indexed like our own, until the value changes.
+        self.cb_fetch_generation = None
+
+        # Seconds after which our own fetch_all_* caches are refetched.
+        # None means they are only dropped by invalidate_fetch_cache
+        # or by changes made through this connection
+        self.fetch_cache_ttl = None
+
+        # Max number of parallel XMLDesc calls when fetching all
+        # domains, pools, volumes or nodedevs ourselves
+        self.fetch_concurrency = _get_default_fetch_concurrency()
 
         self.support = support.SupportCache(weakref.proxy(self))
 
@@ -104,9 +252,17 @@ class VirtinstConnection(object):
 
     def _get_caps(self):
         if not self._caps:
-            capsxml = self._libvirtconn.getCapabilities()
+            hostcache = self.get_host_cache()
+            capsxml = hostcache and hostcache.get("caps", "xml")
+            if capsxml:
+                log.debug("Using cached capabilities for %s", self._uri)
+            else:
+                capsxml = self._libvirtconn.getCapabilities()
+                log.debug("Fetched capabilities for %s: %s",
+                          self._uri, capsxml)
+                if hostcache:
+                    hostcache.set("caps", "xml", capsxml)
             self._caps = Capabilities(self, capsxml)
-            log.debug("Fetched capabilities for %s: %s", self._uri, capsxml)
         return self._caps
     caps = property(_get_caps)
 
@@ -141,7 +297,11 @@ class VirtinstConnection(object):
             ret = self._libvirtconn.close()
         self._libvirtconn = None
         self._uri = None
-        self._fetch_cache = {}
+        self.invalidate_fetch_cache()
+        if self._host_cache:
+            self._host_cache.save()
+        self._host_cache = None
+        self.domcaps_cache = {}
         return ret
 
     def fake_conn_predictable(self):
@@ -149,6 +309,23 @@ class VirtinstConnection(object):
 
     def invalidate_caps(self):
         self._caps = None
+        self.domcaps_cache = {}
+        if self._host_cache:
+            self._host_cache.clear_section("caps")
+
+    def get_host_cache(self):
+        """
+        Return the on disk HostCache for this connection, or None if
+        it is disabled. Data is only reused while the local libvirt,
+        libvirt daemon, and hypervisor versions stay the same.
+        """
+        if not self.host_cache_dir or not self._libvirtconn:
+            return None
+        if not self._host_cache:
+            self._host_cache = HostCache(self.host_cache_dir, self.uri,
+                    [self.local_libvirt_version(), self.daemon_version(),
+                     self.conn_version()])
+        return self._host_cache
 
     def is_open(self):
         return bool(self._libvirtconn)
@@ -199,26 +376,113 @@ class VirtinstConnection(object):
     _FETCH_KEY_VOLS = "vols"
     _FETCH_KEY_NODEDEVS = "nodedevs"
 
-    def _fetch_helper(self, key, raw_cb, override_cb):
+    # Secondary indexes over the fetch caches.
+    #   index name: (fetch key, callback returning an object's index values)
+    _FETCH_INDEXES = {
+        "nodedev-name": (_FETCH_KEY_NODEDEVS,
+            lambda nodedev: [nodedev.name]),
+        "nodedev-type": (_FETCH_KEY_NODEDEVS,
+            lambda nodedev: [nodedev.device_type]),
+        "nodedev-parent": (_FETCH_KEY_NODEDEVS,
+            lambda nodedev: [nodedev.parent]),
+        "nodedev-usbid": (_FETCH_KEY_NODEDEVS,
+            lambda nodedev: [(nodedev.vendor_id, nodedev.product_id)]),
+        "vol-path": (_FETCH_KEY_VOLS,
+            lambda vol: [vol.target_path]),
+        "vol-backing-store": (_FETCH_KEY_VOLS,
+            lambda vol: [vol.backing_store]),
+        "domain-path": (_FETCH_KEY_DOMAINS,
+            lambda vm: ([("disk", disk.get_source_path())
+                         for disk in vm.devices.disk] +
+                        [("os", path) for path in
+                         [vm.os.kernel, vm.os.initrd, vm.os.dtb] if path])),
+        "domain-mac": (_FETCH_KEY_DOMAINS,
+            lambda vm: [(nic.macaddr or "").lower()
+                        for nic in vm.devices.interface]),
+    }
+
+    def _get_fetch_entry(self, key):
+        raw_cb, override_cb = {
+            self._FETCH_KEY_DOMAINS: (
+                self._fetch_all_domains_raw, self.cb_fetch_all_domains),
+            self._FETCH_KEY_POOLS: (
+                self._fetch_all_pools_raw, self.cb_fetch_all_pools),
+            self._FETCH_KEY_VOLS: (
+                self._fetch_all_vols_raw, self.cb_fetch_all_vols),
+            self._FETCH_KEY_NODEDEVS: (
+                self._fetch_all_nodedevs_raw, self.cb_fetch_all_nodedevs),
+        }[key]
+
         if override_cb:
-            return override_cb()  # pragma: no cover
-        if key not in self._fetch_cache:
-            self._fetch_cache[key] = raw_cb()
-        return self._fetch_cache[key][:]
+            return self._get_override_fetch_entry(key, override_cb)
+
+        entry = self._fetch_cache.get(key)
+        if entry is None or entry.is_expired(self.fetch_cache_ttl):
+            entry = _FetchCacheEntry(raw_cb())
+            self._fetch_cache[key] = entry
+        return entry
+
+    def _get_override_fetch_entry(self, key, override_cb):
+        # virt-manager tracks these objects itself, and they can change
+        # under us. Without a generation callback we can't cache anything
+        if not self.cb_fetch_generation:
+            return _FetchCacheEntry(override_cb())  # pragma: no cover
+
+        # pylint: disable=not-callable
+        generation = self.cb_fetch_generation()
+        entry = self._fetch_cache.get(key)
+        if entry is None:
+            entry = _FetchCacheEntry(override_cb())
+            self._fetch_cache[key] = entry
+        elif entry.generation != generation:
+            entry.update_objs(override_cb())
+        entry.generation = generation
+        return entry
+
+    def _set_fetch_cache(self, key, objs):
+        with self._fetch_lock:
+            self._fetch_cache[key] = _FetchCacheEntry(objs)
+
+    def _fetch_helper(self, key):
+        with self._fetch_lock:
+            return self._get_fetch_entry(key).objs[:]
+
+    def _fetch_lookup(self, indexname, values):
+        key, valuecb = self._FETCH_INDEXES[indexname]
+        with self._fetch_lock:
+            return self._get_fetch_entry(key).lookup(
+                    indexname, valuecb, values)
+
+    def _fetch_xmldescs(self, typename, objs):
+        """
+        Call XMLDesc(0) on every passed libvirt object, using up to
+        fetch_concurrency threads, since over a remote connection each
+        call is a network round trip.
+
+        :returns: list of XML strings in the order of objs. Objects that
+            went away in between enumeration and inspection (a TOCTOU
+            race) are skipped.
+        """
+        def _get_xml(obj):
+            try:
+                return obj.XMLDesc(0)
+            except libvirt.libvirtError as e:  # pragma: no cover
+                log.debug("Fetching %s XML failed: %s", typename, e)
+                return None
+
+        workers = min(max(self.fetch_concurrency or 1, 1), len(objs))
+        if workers <= 1:
+            xmls = [_get_xml(obj) for obj in objs]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                xmls = list(executor.map(_get_xml, objs))
+        return [xml for xml in xmls if xml is not None]
 
     def _fetch_all_domains_raw(self):
         dummy1, dummy2, ret = pollhelpers.fetch_vms(
             self, {}, lambda obj, ignore: obj)
-        domains = []
-        for obj in ret:
-            # TOCTOU race: a domain may go away in between enumeration and inspection
-            try:
-                xml = obj.XMLDesc(0)
-            except libvirt.libvirtError as e:  # pragma: no cover
-                log.debug("Fetching domain XML failed: %s", e)
-                continue
-            domains.append(Guest(weakref.proxy(self), parsexml=xml))
-        return domains
+        return [Guest(weakref.proxy(self), parsexml=xml)
+                for xml in self._fetch_xmldescs("domain", ret)]
 
     def _build_pool_raw(self, poolobj):
         return StoragePool(weakref.proxy(self),
@@ -227,66 +491,65 @@ class VirtinstConnection(object):
     def _fetch_all_pools_raw(self):
         dummy1, dummy2, ret = pollhelpers.fetch_pools(
             self, {}, lambda obj, ignore: obj)
-        pools = []
-        for poolobj in ret:
-            # TOCTOU race: a pool may go away in between enumeration and inspection
-            try:
-                pool = self._build_pool_raw(poolobj)
-            except libvirt.libvirtError as e:  # pragma: no cover
-                log.debug("Fetching pool XML failed: %s", e)
-                continue
-            pools.append(pool)
-        return pools
+        return [StoragePool(weakref.proxy(self), parsexml=xml)
+                for xml in self._fetch_xmldescs("pool", ret)]
 
     def _fetch_all_nodedevs_raw(self):
         dummy1, dummy2, ret = pollhelpers.fetch_nodedevs(
             self, {}, lambda obj, ignore: obj)
-        return [NodeDevice(weakref.proxy(self), obj.XMLDesc(0))
-                for obj in ret]
+        # Plenty of hosts have hundreds of nodedevs, and we only ever
+        # list and filter them, so avoid a full XML parse per device
+        return [NodeDeviceRecord(weakref.proxy(self), xml)
+                for xml in self._fetch_xmldescs("nodedev", ret)]
 
-    def _fetch_vols_raw(self, poolxmlobj):
-        ret = []
-        # TOCTOU race: a volume may go away in between enumeration and inspection
+    def _list_pool_vols(self, poolxmlobj):
+        # TOCTOU race: a pool may go away in between enumeration and inspection
         try:
             pool = self._libvirtconn.storagePoolLookupByName(poolxmlobj.name)
         except libvirt.libvirtError:  # pragma: no cover
-            return ret
+            return []
 
         if pool.info()[0] != libvirt.VIR_STORAGE_POOL_RUNNING:
-            return ret
+            return []
 
         dummy1, dummy2, vols = pollhelpers.fetch_volumes(
             self, pool, {}, lambda obj, ignore: obj)
+        return vols
 
-        for vol in vols:
-            try:
-                xml = vol.XMLDesc(0)
-                ret.append(StorageVolume(weakref.proxy(self), parsexml=xml))
-            except libvirt.libvirtError as e:  # pragma: no cover
-                log.debug("Fetching volume XML failed: %s", e)
-        return ret
+    def _build_vols_raw(self, vols):
+        return [StorageVolume(weakref.proxy(self), parsexml=xml)
+                for xml in self._fetch_xmldescs("volume", vols)]
+
+    def _fetch_vols_raw(self, poolxmlobj):
+        return self._build_vols_raw(self._list_pool_vols(poolxmlobj))
 
     def _fetch_all_vols_raw(self):
-        ret = []
+        # Fetch the XML of all pools' volumes in one batch
+        vols = []
         for poolxmlobj in self.fetch_all_pools():
-            ret.extend(self._fetch_vols_raw(poolxmlobj))
-        return ret
+            vols.extend(self._list_pool_vols(poolxmlobj))
+        return self._build_vols_raw(vols)
 
     def _cache_new_pool_raw(self, poolobj):
+        with self._fetch_lock:
+            self._cache_new_pool_locked(poolobj)
+
+    def _cache_new_pool_locked(self, poolobj):
         # Make sure cache is primed
         if self._FETCH_KEY_POOLS not in self._fetch_cache:
             # Nothing cached yet, so next poll will pull in latest bits,
             # so there's nothing to do
             return
 
-        poollist = self._fetch_cache[self._FETCH_KEY_POOLS]
+        poolentry = self._fetch_cache[self._FETCH_KEY_POOLS]
         poolxmlobj = self._build_pool_raw(poolobj)
-        poollist.append(poolxmlobj)
+        poolentry.update_objs(poolentry.objs + [poolxmlobj])
 
         if self._FETCH_KEY_VOLS not in self._fetch_cache:
             return
-        vollist = self._fetch_cache[self._FETCH_KEY_VOLS]
-        vollist.extend(self._fetch_vols_raw(poolxmlobj))
+        volentry = self._fetch_cache[self._FETCH_KEY_VOLS]
+        volentry.update_objs(
+                volentry.objs + self._fetch_vols_raw(poolxmlobj))
 
     def cache_new_pool(self, poolobj):
         """
@@ -301,37 +564,130 @@ class VirtinstConnection(object):
         """
         Returns a list of Guest() objects
         """
-        return self._fetch_helper(
-                self._FETCH_KEY_DOMAINS,
-                self._fetch_all_domains_raw,
-                self.cb_fetch_all_domains)
+        return self._fetch_helper(self._FETCH_KEY_DOMAINS)
 
     def fetch_all_pools(self):
         """
         Returns a list of StoragePool objects
         """
-        return self._fetch_helper(
-                self._FETCH_KEY_POOLS,
-                self._fetch_all_pools_raw,
-                self.cb_fetch_all_pools)
+        return self._fetch_helper(self._FETCH_KEY_POOLS)
 
     def fetch_all_vols(self):
         """
         Returns a list of StorageVolume objects
         """
-        return self._fetch_helper(
-                self._FETCH_KEY_VOLS,
-                self._fetch_all_vols_raw,
-                self.cb_fetch_all_vols)
+        return self._fetch_helper(self._FETCH_KEY_VOLS)
 
     def fetch_all_nodedevs(self):
         """
-        Returns a list of NodeDevice() objects
+        Returns a list of NodeDevice() objects, or read only
+        NodeDeviceRecord() stand ins when we fetched the list ourselves
         """
-        return self._fetch_helper(
-                self._FETCH_KEY_NODEDEVS,
-                self._fetch_all_nodedevs_raw,
-                self.cb_fetch_all_nodedevs)
+        return self._fetch_helper(self._FETCH_KEY_NODEDEVS)
+
+    def fetch_nodedev_by_name(self, name):
+        """
+        Return the fetch_all_nodedevs object with the passed name, or None
+        """
+        ret = self._fetch_lookup("nodedev-name", [name])
+        return ret and ret[0] or None
+
+    def fetch_nodedevs_by_type(self, devtype):
+        """
+        Return the fetch_all_nodedevs objects with the passed
+        capability type, like NodeDevice.CAPABILITY_TYPE_PCI
+        """
+        return self._fetch_lookup("nodedev-type", [devtype])
+
+    def fetch_nodedevs_by_parent(self, parent):
+        """
+        Return the fetch_all_nodedevs objects with the passed parent name
+        """
+        return self._fetch_lookup("nodedev-parent", [parent])
+
+    def fetch_nodedevs_by_usbid(self, vendor_id, product_id):
+        """
+        Return the fetch_all_nodedevs objects with the passed
+        vendor and product ID strings
+        """
+        return self._fetch_lookup("nodedev-usbid", [(vendor_id, product_id)])
+
+    def fetch_vols_by_path(self, path):
+        """
+        Return the fetch_all_vols objects with the passed target path
+        """
+        return self._fetch_lookup("vol-path", [path])
+
+    def fetch_vols_by_backing_store(self, path):
+        """
+        Return the fetch_all_vols objects using path as backing store
+        """
+        return self._fetch_lookup("vol-backing-store", [path])
+
+    def fetch_domains_by_path(self, disk_paths, os_paths=None):
+        """
+        Return the fetch_all_domains objects with a disk source in
+        disk_paths, or a kernel, initrd or dtb in os_paths
+        """
+        values = [("disk", path) for path in disk_paths]
+        values += [("os", path) for path in (os_paths or [])]
+        return self._fetch_lookup("domain-path", values)
+
+    def fetch_domains_by_mac(self, mac):
+        """
+        Return the fetch_all_domains objects with an interface using
+        the passed MAC address, compared case insensitively
+        """
+        return self._fetch_lookup("domain-mac", [(mac or "").lower()])
+
+    def reserve_mac(self, mac):
+        """
+        Mark a MAC address as handed out by this process, so
+        is_mac_in_use reports it even though no defined VM uses it yet
+        """
+        self._reserved_macs.add(mac.lower())
+
+    def release_mac(self, mac):
+        """
+        Drop a reservation made with reserve_mac, for example when the
+        guest using it was defined, or the user cancelled creating it
+        """
+        if mac:
+            self._reserved_macs.discard(mac.lower())
+
+    def _release_xml_macs(self, xml):
+        # The defined guest now covers its MACs via the domain list
+        if not self._reserved_macs:
+            return
+        xpath = "./devices/interface/mac"
+        try:
+            lists = xmlapi.stream_extract(xml, [],
+                    {xpath: ["./@address"]})[2]
+        except Exception as e:  # pragma: no cover
+            log.debug("Error parsing MACs from defined XML: %s", e)
+            return
+        for values in lists[xpath]:
+            self.release_mac(values["./@address"])
+
+    def is_mac_in_use(self, mac):
+        """
+        Return True if the MAC is used by a defined VM, or was reserved
+        with reserve_mac
+        """
+        return (mac.lower() in self._reserved_macs or
+                bool(self.fetch_domains_by_mac(mac)))
+
+    def invalidate_fetch_cache(self):
+        """
+        Drop all our cached fetch_all_* results, so the next call
+        fetches fresh data from libvirt
+        """
+        with self._fetch_lock:
+            self._fetch_cache = {}
+
+    def _invalidate_fetch_key(self, key):
+        with self._fetch_lock:
+            self._fetch_cache.pop(key, None)
 
 
     #########################
@@ -341,6 +697,21 @@ class VirtinstConnection(object):
     def getURI(self):
         return self._uri
 
+    # Objects created through this connection invalidate the matching
+    # cached object list, so collision checks see them
+
+    def defineXML(self, xml):
+        ret = self._libvirtconn.defineXML(xml)
+        self._invalidate_fetch_key(self._FETCH_KEY_DOMAINS)
+        self._release_xml_macs(xml)
+        return ret
+
+    def createXML(self, xml, flags=0):
+        ret = self._libvirtconn.createXML(xml, flags)
+        self._invalidate_fetch_key(self._FETCH_KEY_DOMAINS)
+        self._release_xml_macs(xml)
+        return ret
+
 
     #########################
     # Public version checks #
@@ -297,18 +297,23 @@ class DeviceDisk(Device):
 
         # Find all volumes that have 'path' somewhere in their backing chain
         vols = []
-        volmap = dict((vol.backing_store, vol)
-                      for vol in conn.fetch_all_vols() if vol.backing_store)
         backpath = path
-        while backpath in volmap:
-            vol = volmap[backpath]
-            if vol in vols:
+        while True:
+            backvols = conn.fetch_vols_by_backing_store(backpath)
+            if not backvols:
+                break
+            backpath = backvols[-1].target_path
+            if backpath in vols or backpath == path:
                 break  # pragma: no cover
-            backpath = vol.target_path
             vols.append(backpath)
 
+        # Only look at VMs that reference one of the paths at all
+        os_paths = []
+        if not read_only:
+            os_paths = [path]
+        vms = conn.fetch_domains_by_path([path] + vols, os_paths)
+
         ret = []
-        vms = conn.fetch_all_domains()
         for vm in vms:
             if not read_only:
                 if path in [vm.os.kernel, vm.os.initrd, vm.os.dtb]:
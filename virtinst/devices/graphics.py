@@ -8,6 +8,7 @@ import os
 
 from .device import Device
 from ..logger import log
+from ..nodedev import NodeDevice
 from ..xmlbuilder import XMLBuilder, XMLChildProperty, XMLProperty
 
 
@@ -181,7 +182,8 @@ class DeviceGraphics(Device):
         # If spice GL but rendernode wasn't specified, hardcode
         # the first one
         if not self.rendernode:
-            for nodedev in self.conn.fetch_all_nodedevs():
+            for nodedev in self.conn.fetch_nodedevs_by_type(
+                    NodeDevice.CAPABILITY_TYPE_DRM):
                 if not nodedev.is_drm_render():
                     continue
                 self.rendernode = nodedev.get_devnode().path
@@ -32,10 +32,9 @@ class DeviceHostdev(Device):
             self.product = nodedev.product_id
 
             count = 0
-            for dev in self.conn.fetch_all_nodedevs():
-                if (dev.device_type == NodeDevice.CAPABILITY_TYPE_USBDEV and
-                    dev.vendor_id == self.vendor and
-                    dev.product_id == self.product):
+            for dev in self.conn.fetch_nodedevs_by_usbid(
+                    self.vendor, self.product):
+                if dev.device_type == NodeDevice.CAPABILITY_TYPE_USBDEV:
                     count += 1
 
             if count > 1:
@@ -43,12 +42,7 @@ class DeviceHostdev(Device):
                 self.device = nodedev.device
 
         elif nodedev.device_type == nodedev.CAPABILITY_TYPE_NET:
-            founddev = None
-            for checkdev in self.conn.fetch_all_nodedevs():
-                if checkdev.name == nodedev.parent:
-                    founddev = checkdev
-                    break
-
+            founddev = self.conn.fetch_nodedev_by_name(nodedev.parent)
             self.set_from_nodedev(founddev)
 
         elif nodedev.device_type == nodedev.CAPABILITY_TYPE_SCSIDEV:
@@ -155,22 +155,34 @@ class DeviceInterface(Device):
     def generate_mac(conn):
         """
         Generate a random MAC that doesn't conflict with any VMs on
-        the connection.
+        the connection, or MACs previously generated in this process.
+        """
+        return DeviceInterface.generate_macs(conn, 1)[0]
+
+    @staticmethod
+    def generate_macs(conn, count):
+        """
+        Generate count unique random MACs, like generate_mac. The MACs
+        are reserved on the connection, so they aren't handed out again
+        before the guests using them are defined.
         """
         if conn.fake_conn_predictable():
-            return _testsuite_mac()
-
-        for ignore in range(256):
-            mac = _random_mac(conn)
-            try:
-                DeviceInterface.check_mac_in_use(conn, mac)
-                return mac
-            except RuntimeError:  # pragma: no cover
-                continue
-
-        log.debug(  # pragma: no cover
-                "Failed to generate non-conflicting MAC")
-        return None  # pragma: no cover
+            return [_testsuite_mac() for dummy in range(count)]
+
+        ret = []
+        for ignore in range(count):
+            mac = None
+            for dummy in range(256):
+                newmac = _random_mac(conn)
+                if not conn.is_mac_in_use(newmac):
+                    mac = newmac
+                    conn.reserve_mac(mac)
+                    break
+            if not mac:
+                log.debug(  # pragma: no cover
+                        "Failed to generate non-conflicting MAC")
+            ret.append(mac)
+        return ret
 
     @staticmethod
     def check_mac_in_use(conn, searchmac):
@@ -180,14 +192,10 @@ class DeviceInterface(Device):
         if not searchmac:
             return
 
-        vms = conn.fetch_all_domains()
-        for vm in vms:
-            for nic in vm.devices.interface:
-                nicmac = nic.macaddr or ""
-                if nicmac.lower() == searchmac.lower():
-                    raise RuntimeError(
-                            _("The MAC address '%s' is in use "
-                              "by another virtual machine.") % searchmac)
+        if conn.fetch_domains_by_mac(searchmac):
+            raise RuntimeError(
+                    _("The MAC address '%s' is in use "
+                      "by another virtual machine.") % searchmac)
 
     @staticmethod
     def default_bridge(conn):
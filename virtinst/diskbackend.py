@@ -181,9 +181,10 @@ def path_is_network_vol(conn, path):
     """
     Detect if path is a network volume such as rbd, gluster, etc
     """
-    for volxml in conn.fetch_all_vols():
-        if path and volxml.target_path == path:
-            return volxml.type == "network"
+    if not path:
+        return False
+    for volxml in conn.fetch_vols_by_path(path):
+        return volxml.type == "network"
     return False
 
 
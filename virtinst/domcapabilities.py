@@ -238,8 +238,15 @@ class DomainCapabilities(XMLBuilder):
     ################
 
     @staticmethod
-    def build_from_params(conn, emulator, arch, machine, hvtype):
-        xml = None
+    def _fetch_xml(conn, emulator, arch, machine, hvtype):
+        hostcache = conn.get_host_cache()
+        cachekey = repr((emulator, arch, machine, hvtype))
+        xml = hostcache and hostcache.get("domcaps", cachekey)
+        if xml:
+            log.debug("Using cached domain capabilities for (%s,%s,%s,%s)",
+                      emulator, arch, machine, hvtype)
+            return xml
+
         if conn.support.conn_domain_capabilities():
             try:
                 xml = conn.getDomainCapabilities(emulator, arch,
@@ -250,10 +257,29 @@ class DomainCapabilities(XMLBuilder):
                 log.debug("Error fetching domcapabilities XML",
                     exc_info=True)
 
+        if xml and hostcache:
+            hostcache.set("domcaps", cachekey, xml)
+        return xml
+
+    @staticmethod
+    def build_from_params(conn, emulator, arch, machine, hvtype):
+        """
+        Return the DomainCapabilities for the passed parameters. Results
+        are cached on the connection, so callers must treat the returned
+        object as read only.
+        """
+        key = (emulator, arch, machine, hvtype)
+        if key in conn.domcaps_cache:
+            return conn.domcaps_cache[key]
+
+        xml = DomainCapabilities._fetch_xml(conn, *key)
         if not xml:
             # If not supported, just use a stub object
-            return DomainCapabilities(conn)
-        return DomainCapabilities(conn, parsexml=xml)
+            ret = DomainCapabilities(conn)
+        else:
+            ret = DomainCapabilities(conn, parsexml=xml)
+        conn.domcaps_cache[key] = ret
+        return ret
 
     @staticmethod
     def build_from_guest(guest):
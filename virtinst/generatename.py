@@ -7,6 +7,8 @@
 
 import libvirt
 
+from .logger import log
+
 
 def check_libvirt_collision(collision_cb, val):
     """
@@ -24,6 +26,23 @@ def check_libvirt_collision(collision_cb, val):
     return check
 
 
+def libvirt_names_collision_cb(list_cb, lookup_cb):
+    """
+    Return a collision callback for generate_name, that checks against
+    the names of all objects returned by list_cb, like listAllDomains.
+    The list is fetched once, so each candidate is a local set lookup
+    instead of a libvirt round trip.
+
+    If listing fails, fall back to check_libvirt_collision with lookup_cb
+    """
+    try:
+        names = set(obj.name() for obj in list_cb())
+    except libvirt.libvirtError as e:  # pragma: no cover
+        log.debug("Listing names failed, using lookups: %s", e)
+        return lambda n: check_libvirt_collision(lookup_cb, n)
+    return lambda n: n in names
+
+
 def generate_name(base, collision_cb, suffix="",
                   start_num=1, sep="-", force_num=False):
     """
@@ -141,9 +141,8 @@ class Guest(XMLBuilder):
             basename += "-%s" % _pretty_arch(guest.os.arch)
             force_num = False
 
-        def cb(n):
-            return generatename.check_libvirt_collision(
-                guest.conn.lookupByName, n)
+        cb = generatename.libvirt_names_collision_cb(
+                guest.conn.listAllDomains, guest.conn.lookupByName)
         return generatename.generate_name(basename, cb,
             start_num=force_num and 1 or 2, force_num=force_num,
             sep=not force_num and "-" or "")
@@ -0,0 +1,153 @@
+# This work is licensed under the GNU GPLv2 or later.
+# See the COPYING file in the top-level directory.
+#
+# Opt-in on disk cache for host data that only changes when libvirt or
+# the hypervisor is upgraded, like capabilities XML and support check
+# results. Each connection URI gets its own JSON file, which is thrown
+# away when the libvirt or hypervisor version no longer matches.
+
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+from .logger import log
+
+
+# Bump this if the file layout changes incompatibly
+_FORMAT_VERSION = 1
+
+
+class HostCache(object):
+    """
+    Persistent key/value store for one connection, grouped in sections.
+
+    Changes are kept in memory and written out by save(), which also
+    runs at process exit. Saving merges in entries that other processes
+    wrote in the meantime, so concurrent runs don't drop each other's
+    results.
+
+    :param cachedir: directory to store the cache files in
+    :param uri: connection URI the data belongs to
+    :param versions: list of values, usually the libvirt daemon and
+        hypervisor versions, that must match for stored data to be used
+    """
+    def __init__(self, cachedir, uri, versions):
+        self._uri = uri
+        self._versions = list(versions)
+        filename = hashlib.sha256(uri.encode("utf-8")).hexdigest()[:32]
+        self._path = os.path.join(cachedir, filename + ".json")
+        self._sections = None
+        # Sections changed or cleared since the last save
+        self._dirty = set()
+        self._cleared = set()
+        self._atexit_registered = False
+
+    def _read(self):
+        """
+        Return the sections stored on disk, or {} if the file is
+        missing, unreadable, or for other versions
+        """
+        try:
+            with open(self._path) as f:
+                content = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            log.debug("Error reading host cache %s: %s", self._path, e)
+            return {}
+
+        if (not isinstance(content, dict) or
+            content.get("format") != _FORMAT_VERSION or
+            content.get("uri") != self._uri or
+            content.get("versions") != self._versions):
+            log.debug("Ignoring stale host cache %s", self._path)
+            return {}
+        return content.get("sections") or {}
+
+    def _load(self):
+        if self._sections is None:
+            self._sections = self._read()
+
+    def _mark_dirty(self, section):
+        self._dirty.add(section)
+        if not self._atexit_registered:
+            atexit.register(self.save)
+            self._atexit_registered = True
+
+    def _write(self, sections):
+        content = {
+            "format": _FORMAT_VERSION,
+            "uri": self._uri,
+            "versions": self._versions,
+            "sections": sections,
+        }
+        cachedir = os.path.dirname(self._path)
+        # Write to a temp file and rename, so readers never see
+        # a partial file
+        fd, tmppath = tempfile.mkstemp(dir=cachedir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(content, f)
+            os.replace(tmppath, self._path)
+        except BaseException:
+            os.unlink(tmppath)
+            raise
+
+    def save(self):
+        """
+        Write out pending changes, merged with the current file contents
+        """
+        # Drop our atexit hook, so it doesn't keep us alive after
+        # the connection is closed. The next change registers it again
+        if self._atexit_registered:
+            atexit.unregister(self.save)
+            self._atexit_registered = False
+        if not self._dirty:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            # Hold a lock over read, merge and write, so concurrent
+            # runs can't lose each other's entries
+            with open(self._path + ".lock", "w") as lockfile:
+                fcntl.flock(lockfile, fcntl.LOCK_EX)
+                sections = {}
+                for section, values in self._read().items():
+                    if section not in self._cleared:
+                        sections[section] = values
+                for section in self._dirty:
+                    sections.setdefault(section, {}).update(
+                            self._sections.get(section, {}))
+                self._write(sections)
+        except Exception as e:
+            log.debug("Error writing host cache %s: %s", self._path, e)
+
+        self._dirty = set()
+        self._cleared = set()
+
+    def get(self, section, key):
+        """
+        Return the stored value, or None
+        """
+        self._load()
+        return self._sections.get(section, {}).get(key)
+
+    def set(self, section, key, value):
+        """
+        Store the JSON serializable value. It is written out by save()
+        """
+        self._load()
+        self._sections.setdefault(section, {})[key] = value
+        self._mark_dirty(section)
+
+    def clear_section(self, section):
+        """
+        Drop all stored values in section
+        """
+        self._load()
+        self._sections.pop(section, None)
+        self._cleared.add(section)
+        self._mark_dirty(section)
@@ -4,6 +4,10 @@
 # See the COPYING file in the top-level directory.
 
 import logging
+import logging.handlers
+import os
+import sys
+import traceback
 
 # This is exported by virtinst/__init__.py
 log = logging.getLogger("virtinst")
@@ -19,3 +23,88 @@ def reset_logging():
     # Undo any logging on our log handler. Needed for test suite
     for handler in log.handlers:
         log.removeHandler(handler)
+
+
+def setup_logging(appname, debug_stdout, do_quiet, cli_app=True):
+    """
+    Set up file and stderr logging for the app. This lives here rather
+    than in cli.py so virt-manager can use it without importing the
+    whole cli parser machinery at startup
+    """
+    # Imported here to avoid import loops, every module imports logger.py
+    from .buildconfig import BuildConfig
+    from .connection import VirtinstConnection
+    from . import xmlutil
+
+    vi_dir = VirtinstConnection.get_app_cache_dir()
+    logfile = os.path.join(vi_dir, appname + ".log")
+    if xmlutil.in_testsuite():
+        vi_dir = None
+        logfile = None
+
+    try:  # pragma: no cover
+        if vi_dir and not os.access(vi_dir, os.W_OK):
+            if os.path.exists(vi_dir):
+                raise RuntimeError("No write access to directory %s" % vi_dir)
+
+            try:
+                os.makedirs(vi_dir, 0o751)
+            except IOError as e:
+                raise RuntimeError("Could not create directory %s: %s" %
+                                   (vi_dir, e)) from None
+
+        if (logfile and
+            os.path.exists(logfile) and
+            not os.access(logfile, os.W_OK)):
+            raise RuntimeError("No write access to logfile %s" % logfile)
+    except Exception as e:  # pragma: no cover
+        log.warning("Error setting up logfile: %s", e)
+        logfile = None
+
+    dateFormat = "%a, %d %b %Y %H:%M:%S"
+    fileFormat = ("[%(asctime)s " + appname + " %(process)d] "
+                  "%(levelname)s (%(module)s:%(lineno)d) %(message)s")
+    streamErrorFormat = "%(levelname)-8s %(message)s"
+
+    reset_logging()
+
+    log.setLevel(logging.DEBUG)
+    if logfile:
+        fileHandler = logging.handlers.RotatingFileHandler(
+            logfile, "ae", 1024 * 1024, 5)
+        fileHandler.setFormatter(
+            logging.Formatter(fileFormat, dateFormat))
+        log.addHandler(fileHandler)
+
+    streamHandler = logging.StreamHandler(sys.stderr)
+    if debug_stdout:
+        streamHandler.setLevel(logging.DEBUG)
+        streamHandler.setFormatter(logging.Formatter(fileFormat,
+                                                     dateFormat))
+    elif cli_app or not logfile:
+        # Have cli tools show WARN/ERROR by default
+        if do_quiet:
+            level = logging.ERROR
+        else:
+            level = logging.WARN
+        streamHandler.setLevel(level)
+        streamHandler.setFormatter(logging.Formatter(streamErrorFormat))
+    else:  # pragma: no cover
+        streamHandler = None
+
+    if streamHandler:
+        log.addHandler(streamHandler)
+
+    # Log uncaught exceptions
+    def exception_log(typ, val, tb):  # pragma: no cover
+        log.debug("Uncaught exception:\n%s",
+                      "".join(traceback.format_exception(typ, val, tb)))
+        if not debug_stdout:
+            # If we are already logging to stdout, don't double print
+            # the backtrace
+            sys.__excepthook__(typ, val, tb)
+    sys.excepthook = exception_log
+
+    # Log the app command string
+    log.debug("Version %s launched with command line: %s",
+              BuildConfig.version, " ".join(sys.argv))
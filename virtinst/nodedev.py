@@ -42,7 +42,10 @@ class DevNode(XMLBuilder):
     path = XMLProperty(".")
 
 
-class NodeDevice(XMLBuilder):
+class _NodeDeviceBase(object):
+    """
+    Helpers shared between NodeDevice and NodeDeviceRecord
+    """
     CAPABILITY_TYPE_NET = "net"
     CAPABILITY_TYPE_PCI = "pci"
     CAPABILITY_TYPE_USBDEV = "usb_device"
@@ -52,31 +55,6 @@ class NodeDevice(XMLBuilder):
     CAPABILITY_TYPE_DRM = "drm"
     CAPABILITY_TYPE_MDEV = "mdev"
 
-    @staticmethod
-    def lookupNodedevByName(conn, name):
-        """
-        Search the nodedev list cache for a matching name, and return the
-        result.
-
-        :param conn: libvirt.virConnect instance to perform the lookup on
-        :param conn: nodedev name
-        :returns: NodeDevice instance
-        """
-        for nodedev in conn.fetch_all_nodedevs():
-            if nodedev.name == name:
-                return nodedev
-
-
-    XML_NAME = "device"
-
-    # Libvirt can generate bogus 'system' XML:
-    # https://bugzilla.redhat.com/show_bug.cgi?id=1184131
-    _XML_SANITIZE = True
-
-    name = XMLProperty("./name")
-    parent = XMLProperty("./parent")
-    device_type = XMLProperty("./capability/@type")
-
     def get_mdev_uuid(self):
         # libvirt 7.3.0 added a <uuid> element to the nodedev xml for mdev
         # types. For older versions, we unfortunately have to parse the nodedev
@@ -130,6 +108,39 @@ class NodeDevice(XMLBuilder):
     def is_drm_render(self):
         return self.device_type == "drm" and self.drm_type == "render"
 
+    def get_devnode(self, parent="by-path"):
+        for d in self.devnodes:
+            paths = d.path.split(os.sep)
+            if len(paths) > 2 and paths[-2] == parent:
+                return d
+        if len(self.devnodes) > 0:
+            return self.devnodes[0]
+
+
+class NodeDevice(_NodeDeviceBase, XMLBuilder):
+    @staticmethod
+    def lookupNodedevByName(conn, name):
+        """
+        Search the nodedev list cache for a matching name, and return the
+        result.
+
+        :param conn: libvirt.virConnect instance to perform the lookup on
+        :param conn: nodedev name
+        :returns: NodeDevice instance
+        """
+        return conn.fetch_nodedev_by_name(name)
+
+
+    XML_NAME = "device"
+
+    # Libvirt can generate bogus 'system' XML:
+    # https://bugzilla.redhat.com/show_bug.cgi?id=1184131
+    _XML_SANITIZE = True
+
+    name = XMLProperty("./name")
+    parent = XMLProperty("./parent")
+    device_type = XMLProperty("./capability/@type")
+
 
     ##################
     # XML properties #
@@ -171,14 +182,64 @@ class NodeDevice(XMLBuilder):
     drm_type = XMLProperty("./capability/type")
     devnodes = XMLChildProperty(DevNode)
 
-    def get_devnode(self, parent="by-path"):
-        for d in self.devnodes:
-            paths = d.path.split(os.sep)
-            if len(paths) > 2 and paths[-2] == parent:
-                return d
-        if len(self.devnodes) > 0:
-            return self.devnodes[0]
-
     # type='mdev' options
     type_id = XMLProperty("./capability/type/@id")
     uuid = XMLProperty("./capability/uuid")
+
+
+class _DevNodeRecord(object):
+    def __init__(self, node_type, path):
+        self.node_type = node_type
+        self.path = path
+
+
+class NodeDeviceRecord(_NodeDeviceBase):
+    """
+    Read only stand in for NodeDevice, used for listing and filtering
+    the host device list. The XMLProperty values are pulled out of the
+    XML in a single streaming pass, which is much cheaper than building
+    a full XML document per device on hosts with hundreds of them.
+
+    Anything else, like get_xml() or editing the object, is passed
+    through to a full NodeDevice, which is parsed on first use
+    by get_nodedev()
+    """
+    def __init__(self, conn, parsexml):
+        self.conn = conn
+        self._parsexml = parsexml
+        self._nodedev = None
+        self._values = None
+
+        ret = NodeDevice._stream_xml_props(parsexml,
+                {"./devnode": [".", "./@type"]})
+        if ret is None:
+            # Let the full parse raise the appropriate error
+            self.get_nodedev()
+            return
+
+        self._values, lists = ret
+        self.devnodes = [_DevNodeRecord(d["./@type"], d["."])
+                         for d in lists["./devnode"]]
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't set on the instance
+        values = self.__dict__.get("_values")
+        if values and name in values:
+            prop, val = values[name]
+            prop._track_usage()  # pylint: disable=protected-access
+            return val
+        if name.startswith("__") or "_parsexml" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.get_nodedev(), name)
+
+    def __repr__(self):
+        return "<%s %s %s>" % (self.__class__.__name__,
+                               self.name, id(self))
+
+    def get_nodedev(self):
+        """
+        Return the full NodeDevice object for this XML
+        """
+        if self._nodedev is None:
+            self._nodedev = NodeDevice(self.conn, self._parsexml)
+        return self._nodedev
@@ -9,13 +9,30 @@
 import datetime
 import os
 import re
-
-from gi.repository import Libosinfo
+import threading
 
 from . import xmlutil
 from .logger import log
 
 
+class _LazyLibosinfo(object):
+    """
+    Loading the Libosinfo typelib is slow, and many users, like
+    virt-manager startup, never touch the OS database. Defer the
+    import until the first attribute access
+    """
+    _module = None
+
+    def __getattr__(self, name):
+        if _LazyLibosinfo._module is None:
+            from gi.repository import Libosinfo as _Libosinfo
+            _LazyLibosinfo._module = _Libosinfo
+        return getattr(_LazyLibosinfo._module, name)
+
+
+Libosinfo = _LazyLibosinfo()
+
+
 def _media_create_from_location(location):
     if not hasattr(Libosinfo.Media, "create_from_location_with_flags"):
         return Libosinfo.Media.create_from_location(  # pragma: no cover
@@ -56,6 +73,12 @@ class _OSDB(object):
     def __init__(self):
         self.__os_loader = None
         self.__os_generic = None
+        self.__os_list = None
+        self.__os_list_sorted = {}
+        self.__os_list_lock = threading.Lock()
+        # The OS list can be built in a thread, see virtManager oslist,
+        # so make sure only one loader and generic OS are ever created
+        self.__os_loader_lock = threading.RLock()
 
     #################
     # Internal APIs #
@@ -63,32 +86,66 @@ class _OSDB(object):
 
     @property
     def _os_generic(self):
-        if not self.__os_generic:
-            # Add our custom generic variant
-            o = Libosinfo.Os()
-            o.set_param("short-id", "generic")
-            o.set_param("name",
-                    _("Generic or unknown OS. Usage is not recommended."))
-            self.__os_generic = _OsVariant(o)
+        with self.__os_loader_lock:
+            if not self.__os_generic:
+                # Add our custom generic variant
+                o = Libosinfo.Os()
+                o.set_param("short-id", "generic")
+                o.set_param("name",
+                        _("Generic or unknown OS. Usage is not recommended."))
+                self.__os_generic = _OsVariant(o)
         return self.__os_generic
 
     @property
     def _os_loader(self):
-        if not self.__os_loader:
-            loader = Libosinfo.Loader()
-            loader.process_default_path()
+        with self.__os_loader_lock:
+            if not self.__os_loader:
+                loader = Libosinfo.Loader()
+                loader.process_default_path()
 
-            self.__os_loader = loader
+                self.__os_loader = loader
         return self.__os_loader
 
     @property
     def _os_db(self):
         return self._os_loader.get_db()
 
+    def _get_sorted_os_list(self, sortkey):
+        """
+        Wrapping every libosinfo OS in an _OsVariant and natural sorting
+        the result is expensive, so only do it once per sortkey per process
+        """
+        with self.__os_list_lock:
+            if self.__os_list is None:
+                oslist = [_OsVariant(osent) for osent in
+                          self._os_db.get_os_list().get_elements()]
+                oslist.append(self._os_generic)
+                self.__os_list = oslist
+
+            if sortkey not in self.__os_list_sorted:
+                # human/natural sort, but with reverse sorted numbers
+                def to_int(text):
+                    return (int(text) * -1) if text.isdigit() else text.lower()
+                def alphanum_key(obj):
+                    val = getattr(obj, sortkey)
+                    return [to_int(c) for c in re.split('([0-9]+)', val)]
+                self.__os_list_sorted[sortkey] = list(
+                        sorted(self.__os_list, key=alphanum_key))
+            return self.__os_list_sorted[sortkey]
+
     ###############
     # Public APIs #
     ###############
 
+    def load(self):
+        """
+        Load the libosinfo DB now, rather than on first use. Callers
+        that use OSDB from a thread should call this first from the
+        main thread
+        """
+        ignore = self._os_loader
+        ignore = self._os_generic
+
     def lookup_os_by_full_id(self, full_id, raise_error=False):
         osobj = self._os_db.get_os(full_id)
         if osobj is None:
@@ -154,17 +211,7 @@ class _OSDB(object):
         """
         List all OSes in the DB, sorting by the passes _OsVariant attribute
         """
-        oslist = [_OsVariant(osent) for osent in
-                  self._os_db.get_os_list().get_elements()]
-        oslist.append(self._os_generic)
-
-        # human/natural sort, but with reverse sorted numbers
-        def to_int(text):
-            return (int(text) * -1) if text.isdigit() else text.lower()
-        def alphanum_key(obj):
-            val = getattr(obj, sortkey)
-            return [to_int(c) for c in re.split('([0-9]+)', val)]
-        return list(sorted(oslist, key=alphanum_key))
+        return self._get_sorted_os_list(sortkey)[:]
 
 
 OSDB = _OSDB()
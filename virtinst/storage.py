@@ -479,13 +479,13 @@ class StorageVolume(_StorageObject):
                     os.path.dirname(checkpath) == pooltarget):
                     collidelist.append(os.path.basename(checkpath))
 
+        StoragePool.ensure_pool_is_running(pool_object, refresh=True)
+        volcb = generatename.libvirt_names_collision_cb(
+                pool_object.listAllVolumes, pool_object.storageVolLookupByName)
+
         def cb(tryname):
-            if tryname in collidelist:
-                return True
-            return generatename.check_libvirt_collision(
-                pool_object.storageVolLookupByName, tryname)
+            return tryname in collidelist or volcb(tryname)
 
-        StoragePool.ensure_pool_is_running(pool_object, refresh=True)
         return generatename.generate_name(basename, cb, **kwargs)
 
     TYPE_FILE = getattr(libvirt, "VIR_STORAGE_VOL_FILE", 0)
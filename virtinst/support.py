@@ -107,6 +107,11 @@ class _SupportCheck(object):
         self.hv_version = hv_version or {}
         self.hv_libvirt_version = hv_libvirt_version or {}
 
+        # Stable across runs, used as the on disk HostCache key
+        self.cache_key = repr((self.function, self.run_args, self.flag,
+                               self.version, self.hv_version,
+                               self.hv_libvirt_version))
+
         if self.function:
             assert len(function.split(".")) == 2
 
@@ -182,7 +187,11 @@ def _make(*args, **kwargs):
 
     def cache_wrapper(self, data=None):
         if support_obj not in self._cache:
-            support_ret = support_obj(self._virtconn, data or self._virtconn)
+            support_ret = self._get_persistent(support_obj)
+            if support_ret is None:
+                support_ret = support_obj(self._virtconn,
+                                          data or self._virtconn)
+                self._set_persistent(support_obj, support_ret)
             self._cache[support_obj] = support_ret
         return self._cache[support_obj]
 
@@ -228,6 +237,17 @@ class SupportCache:
         self._cache = {}
         self._virtconn = virtconn
 
+    def _get_persistent(self, support_obj):
+        hostcache = self._virtconn.get_host_cache()
+        if not hostcache:
+            return None
+        return hostcache.get("support", support_obj.cache_key)
+
+    def _set_persistent(self, support_obj, support_ret):
+        hostcache = self._virtconn.get_host_cache()
+        if hostcache:
+            hostcache.set("support", support_obj.cache_key, bool(support_ret))
+
     conn_domain = _make(
         function="virConnect.listAllDomains", run_args=())
     conn_storage = _make(
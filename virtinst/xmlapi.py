@@ -4,6 +4,13 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
+import copy
+import itertools
+import os
+import re
+import threading
+from xml.parsers import expat
+
 import libxml2
 
 from . import xmlutil
@@ -12,6 +19,12 @@ from .logger import log
 # pylint: disable=protected-access
 
 
+# Segment formats that we know how to cache node lookups for:
+#   ., foo, ns:foo, foo[3], foo[@bar='baz']
+_SIMPLE_SEGMENT_RE = re.compile(
+        r"^(\.|[\w.-]+(:[\w.-]+)?)(\[(\d+|@[\w:.-]+='[^'\]]*')\])?$")
+
+
 class _XPathSegment(object):
     """
     Class representing a single 'segment' of an xpath string. For example,
@@ -74,6 +87,16 @@ class _XPath(object):
             self.segments = self.segments[:-1]
         self.xpath = self.join(self.segments)
 
+        # Whether node lookups for this xpath can be cached. We only
+        # cache the simple xpath formats that XMLProperty uses, so any
+        # arbitrary user xpath passed via --xml is always evaluated
+        self.cacheable = all(_SIMPLE_SEGMENT_RE.match(seg.fullsegment)
+                             for seg in self.segments)
+        # If the xpath matches on a property value, a property change can
+        # alter which node it resolves to
+        self.has_prop_condition = any(seg.condition_prop
+                                      for seg in self.segments)
+
     @staticmethod
     def join(segments):
         return "/".join(s.fullsegment for s in segments)
@@ -82,17 +105,65 @@ class _XPath(object):
         return self.join(self.segments[:-1])
 
 
+# fullxpath string -> _XPath. XMLProperty xpaths are a small fixed set,
+# but make sure pathological usage can't grow this forever
+_XPATH_CACHE_MAX = 20000
+_xpath_cache = {}
+
+
+def _get_xpath(fullxpath):
+    """
+    Return a cached _XPath for the passed xpath string. _XPath objects
+    are treated as immutable after creation so they can be shared
+    """
+    ret = _xpath_cache.get(fullxpath)
+    if ret is None:
+        if len(_xpath_cache) >= _XPATH_CACHE_MAX:
+            _xpath_cache.clear()  # pragma: no cover
+        ret = _XPath(fullxpath)
+        _xpath_cache[fullxpath] = ret
+    return ret
+
+
+# Source of globally unique _XMLBase.revision values
+_revision_counter = itertools.count(1)
+
+
 class _XMLBase(object):
     NAMESPACES = {}
+    # Toggle for the resolved node cache, mostly for benchmarking
+    USE_NODE_CACHE = True
+
     @classmethod
     def register_namespace(cls, nsname, uri):
         cls.NAMESPACES[nsname] = uri
+        # Compiled lxml xpaths have the namespace map baked in
+        _lxml_xpath_cache.clear()
+
+    def __init__(self):
+        # Resolved xpath -> backend node (or None). Must be invalidated
+        # on every change that can free nodes or alter which node an
+        # xpath resolves to, otherwise we hand out stale or freed nodes
+        self._node_cache = {}
+        # Same, but for xpaths that have a [@prop='val'] condition
+        self._node_cache_propcond = {}
+
+        # Changes whenever the document is altered. Users can also bump
+        # it when their own state that feeds into the XML changes. Values
+        # are unique across all documents, so they can be used as a cache
+        # key without tracking which document they came from
+        self.revision = next(_revision_counter)
+
+    def bump_revision(self):
+        self.revision = next(_revision_counter)
 
     def copy_api(self):
         raise NotImplementedError()
     def count(self, xpath):
         raise NotImplementedError()
-    def _find(self, fullxpath):
+    def _xpath_eval(self, xpath):
+        raise NotImplementedError()
+    def _xpath_eval_relative(self, basenode, xpath):
         raise NotImplementedError()
     def _node_tostring(self, node):
         raise NotImplementedError()
@@ -123,6 +194,34 @@ class _XMLBase(object):
     def _sanitize_xml(self, xml):
         raise NotImplementedError()
 
+    def _invalidate_node_cache(self):
+        self._node_cache.clear()
+        self._node_cache_propcond.clear()
+
+    def _find(self, fullxpath):
+        xpathobj = _get_xpath(fullxpath)
+        xpath = xpathobj.xpath
+
+        cache = None
+        if self.USE_NODE_CACHE and xpathobj.cacheable:
+            cache = self._node_cache
+            if xpathobj.has_prop_condition:
+                cache = self._node_cache_propcond
+            if xpath in cache:
+                return cache[xpath]
+
+        try:
+            node = self._xpath_eval(xpath)
+        except Exception as e:
+            log.debug("fullxpath=%s xpath=%s eval failed",
+                    fullxpath, xpath, exc_info=True)
+            raise RuntimeError("%s %s" % (fullxpath, str(e))) from None
+
+        ret = (node[0] if len(node) else None)
+        if cache is not None:
+            cache[xpath] = ret
+        return ret
+
     def get_xml(self, xpath):
         node = self._find(xpath)
         if node is None:
@@ -135,12 +234,54 @@ class _XMLBase(object):
             return None
         if is_bool:
             return True
-        xpathobj = _XPath(xpath)
+        xpathobj = _get_xpath(xpath)
         if xpathobj.is_prop:
             return self._node_get_property(node, xpathobj.propname)
         return self._node_get_text(node)
 
+    def get_xpath_contents(self, basexpath, xpathlist):
+        """
+        Bulk version of get_xpath_content. xpathlist is a list of
+        (xpath, is_bool) pairs, with xpaths starting with '.' relative
+        to basexpath. The base node is
+        only looked up once and the xpaths are evaluated from there,
+        rather than each walking down from the document root.
+
+        Returns a list of values in the same order as xpathlist
+        """
+        basenode = self._find(basexpath)
+        ret = []
+        for xpath, is_bool in xpathlist:
+            if ".." in xpath:
+                # _XPath can only flatten .. in absolute xpaths
+                ret.append(self.get_xpath_content(
+                    basexpath + xpath[1:], is_bool))
+                continue
+            if basenode is None:
+                ret.append(None)
+                continue
+
+            xpathobj = _get_xpath(xpath)
+            try:
+                nodes = self._xpath_eval_relative(basenode, xpathobj.xpath)
+            except Exception as e:
+                log.debug("basexpath=%s xpath=%s eval failed",
+                        basexpath, xpath, exc_info=True)
+                raise RuntimeError("%s %s" % (xpath, str(e))) from None
+
+            node = (nodes[0] if len(nodes) else None)
+            if node is None:
+                ret.append(None)
+            elif is_bool:
+                ret.append(True)
+            elif xpathobj.is_prop:
+                ret.append(self._node_get_property(node, xpathobj.propname))
+            else:
+                ret.append(self._node_get_text(node))
+        return ret
+
     def set_xpath_content(self, xpath, setval):
+        self.bump_revision()
         node = self._find(xpath)
         if setval is False:
             # Boolean False, means remove the node entirely
@@ -159,6 +300,7 @@ class _XMLBase(object):
             self._node_set_content(xpath, node, setval)
 
     def node_add_xml(self, xml, xpath):
+        self.bump_revision()
         newnode = self._node_from_xml(xml)
         parentnode = self._node_make_stub(xpath)
         self._node_add_child(xpath, parentnode, newnode)
@@ -167,6 +309,7 @@ class _XMLBase(object):
         """
         Replace the node at xpath with the passed in xml
         """
+        self.bump_revision()
         newnode = self._node_from_xml(xml)
         self._node_replace_child(xpath, newnode)
 
@@ -176,7 +319,8 @@ class _XMLBase(object):
         of whether it has children or not, and then clean up the XML
         chain
         """
-        xpathobj = _XPath(fullxpath)
+        self.bump_revision()
+        xpathobj = _get_xpath(fullxpath)
         parentnode = self._find(xpathobj.parent_xpath())
         childnode = self._find(fullxpath)
         if parentnode is None or childnode is None:
@@ -193,7 +337,7 @@ class _XMLBase(object):
             {"expectname": expected_root_name, "foundname": rootname})
 
     def _node_set_content(self, xpath, node, setval):
-        xpathobj = _XPath(xpath)
+        xpathobj = _get_xpath(xpath)
         if setval is not None:
             setval = str(setval)
         if xpathobj.is_prop:
@@ -223,10 +367,10 @@ class _XMLBase(object):
         Even if <bar> didn't exist before. So we fill in the dependent property
         expression values
         """
-        xpathobj = _XPath(fullxpath)
+        xpathobj = _get_xpath(fullxpath)
         parentxpath = "."
         parentnode = self._find(parentxpath)
-        if not parentnode:
+        if parentnode is None:
             raise xmlutil.DevError(
                     "Did not find XML root node for xpath=%s" % fullxpath)
 
@@ -257,7 +401,7 @@ class _XMLBase(object):
         if it doesn't have any children or attributes, so we don't
         leave stale elements in the XML
         """
-        xpathobj = _XPath(fullxpath)
+        xpathobj = _get_xpath(fullxpath)
         segments = xpathobj.segments[:]
         parent = None
         while segments:
@@ -280,6 +424,12 @@ def node_is_text(n):
 
 
 class _Libxml2API(_XMLBase):
+    BACKEND_NAME = "libxml2"
+
+    @staticmethod
+    def check_available():
+        pass
+
     def __init__(self, xml):
         _XMLBase.__init__(self)
 
@@ -299,6 +449,7 @@ class _Libxml2API(_XMLBase):
         if not hasattr(self, "_doc"):
             # In case we error when parsing the doc
             return
+        self._invalidate_node_cache()
         self._doc.freeDoc()
         self._doc = None
         self._ctx.xpathFreeContext()
@@ -312,15 +463,14 @@ class _Libxml2API(_XMLBase):
     def copy_api(self):
         return _Libxml2API(self._doc.children.serialize())
 
-    def _find(self, fullxpath):
-        xpath = _XPath(fullxpath).xpath
+    def _xpath_eval(self, xpath):
+        return self._ctx.xpathEval(xpath) or []
+    def _xpath_eval_relative(self, basenode, xpath):
+        self._ctx.setContextNode(basenode)
         try:
-            node = self._ctx.xpathEval(xpath)
-        except Exception as e:
-            log.debug("fullxpath=%s xpath=%s eval failed",
-                    fullxpath, xpath, exc_info=True)
-            raise RuntimeError("%s %s" % (fullxpath, str(e))) from None
-        return (node and node[0] or None)
+            return self._ctx.xpathEval(xpath) or []
+        finally:
+            self._ctx.setContextNode(self._doc.children)
 
     def count(self, xpath):
         return len(self._ctx.xpathEval(xpath))
@@ -335,6 +485,14 @@ class _Libxml2API(_XMLBase):
     def _node_set_text(self, node, setval):
         if setval is not None:
             setval = xmlutil.xml_escape(setval)
+        # setContent frees all existing children. Text only nodes are
+        # the common case, and those are never in the node cache
+        child = node.children
+        while child:
+            if not node_is_text(child):
+                self._invalidate_node_cache()
+                break
+            child = child.next
         node.setContent(setval)
 
     def _node_get_property(self, node, propname):
@@ -342,6 +500,7 @@ class _Libxml2API(_XMLBase):
         if prop:
             return prop.content
     def _node_set_property(self, node, propname, setval):
+        self._node_cache_propcond.clear()
         if setval is None:
             prop = node.hasProp(propname)
             if prop:
@@ -371,8 +530,10 @@ class _Libxml2API(_XMLBase):
         return newnode
 
     def node_clear(self, xpath):
+        self.bump_revision()
         node = self._find(xpath)
         if node:
+            self._invalidate_node_cache()
             propnames = [p.name for p in (node.properties or [])]
             for p in propnames:
                 node.unsetProp(p)
@@ -385,6 +546,7 @@ class _Libxml2API(_XMLBase):
         return node.name
 
     def _node_remove_child(self, parentnode, childnode):
+        self._invalidate_node_cache()
         node = childnode
 
         # Look for preceding whitespace and remove it
@@ -400,6 +562,7 @@ class _Libxml2API(_XMLBase):
 
     def _node_add_child(self, parentxpath, parentnode, newnode):
         ignore = parentxpath
+        self._invalidate_node_cache()
         if not node_is_text(parentnode.get_last()):
             prevsib = parentnode.get_prev()
             if node_is_text(prevsib):
@@ -415,7 +578,408 @@ class _Libxml2API(_XMLBase):
 
     def _node_replace_child(self, xpath, newnode):
         oldnode = self._find(xpath)
+        self._invalidate_node_cache()
         oldnode.replaceNode(newnode)
 
 
+########################
+# Streaming extraction #
+########################
+
+class _StreamXPath(object):
+    """
+    Compiled xpath for stream_extract. Only the subset of xpath used by
+    most XMLProperty definitions is supported: plain element names, with
+    optional [@prop='val'] conditions, and a final optional @prop.
+    """
+    def __init__(self, xpath, is_bool, subxpaths=None):
+        xpathobj = _XPath(xpath)
+        if (xpathobj.segments[0].fullsegment != "." or
+            any(s.condition_num is not None or "[" in s.nodename
+                for s in xpathobj.segments)):
+            raise ValueError("xpath=%s not supported for streaming" % xpath)
+
+        self.is_bool = is_bool
+        self.propname = xpathobj.propname
+        self.segments = []
+        for seg in xpathobj.segments[1:]:
+            name = seg.nodename
+            if seg.nsname:
+                name = seg.nsname + ":" + name
+            self.segments.append((name, seg.condition_prop, seg.condition_val))
+
+        # For list xpaths, the values to pull from every matching element
+        self.subxpaths = None
+        if subxpaths is not None:
+            self.subxpaths = []
+            for subxpath in subxpaths:
+                if subxpath != "." and not subxpath.startswith("./@"):
+                    raise ValueError(
+                        "subxpath=%s not supported for streaming" % subxpath)
+                self.subxpaths.append(subxpath)
+
+    def segment_matches(self, pos, name, attrs):
+        segname, condprop, condval = self.segments[pos]
+        if segname != name:
+            return False
+        return not condprop or attrs.get(condprop) == condval
+
+
+def stream_extract(xml, xpathlist, listxpaths=None):
+    """
+    Single pass, SAX style extraction of values from an XML string,
+    without building a document tree. Meant for listing large numbers
+    of objects where a full XMLAPI per object is too expensive.
+
+    :param xpathlist: list of (xpath, is_bool) pairs, values are
+        returned the same as get_xpath_content would
+    :param listxpaths: dict of element xpath -> list of subxpaths. For
+        every matching element a dict of subxpath -> value is returned.
+        Subxpaths can only be '.' or './@prop'
+
+    :returns: (root element name, list of values in xpathlist order,
+        dict of listxpath -> list of dicts)
+    """
+    matchers = [_StreamXPath(xpath, is_bool) for xpath, is_bool in xpathlist]
+    values = [None] * len(matchers)
+    lists = {}
+    for xpath, subxpaths in (listxpaths or {}).items():
+        matchers.append(_StreamXPath(xpath, False, subxpaths))
+        lists[xpath] = []
+    listxpathnames = list(lists)
+    done = [False] * len(matchers)
+
+    # Per open element, the (matcher index, next segment) partial matches
+    stack = []
+    # Text being collected for a matched element: [depth, chunks, setter]
+    captures = []
+    rootname = []
+
+    def _set_value(idx):
+        def _cb(text):
+            values[idx] = text
+        return _cb
+
+    def _set_subvalue(record, subxpath):
+        def _cb(text):
+            record[subxpath] = text
+        return _cb
+
+    def _matched(idx, attrs):
+        matcher = matchers[idx]
+        if matcher.subxpaths is not None:
+            record = {}
+            for subxpath in matcher.subxpaths:
+                if subxpath == ".":
+                    captures.append([len(stack), [],
+                                     _set_subvalue(record, subxpath)])
+                else:
+                    record[subxpath] = attrs.get(subxpath[3:])
+            lists[listxpathnames[idx - len(values)]].append(record)
+            return
+
+        done[idx] = True
+        if matcher.is_bool:
+            values[idx] = True
+        elif matcher.propname:
+            values[idx] = attrs.get(matcher.propname)
+        else:
+            captures.append([len(stack), [], _set_value(idx)])
+
+    def _start(name, attrs):
+        if not stack:
+            rootname.append(name)
+            candidates = [(idx, 0) for idx in range(len(matchers))]
+        else:
+            candidates = []
+            for idx, pos in stack[-1]:
+                if (not done[idx] and
+                    matchers[idx].segment_matches(pos, name, attrs)):
+                    candidates.append((idx, pos + 1))
+
+        partial = []
+        for idx, pos in candidates:
+            if done[idx]:
+                continue
+            if pos == len(matchers[idx].segments):
+                _matched(idx, attrs)
+            else:
+                partial.append((idx, pos))
+        stack.append(partial)
+
+    def _end(name):
+        ignore = name
+        stack.pop()
+        while captures and captures[-1][0] == len(stack):
+            dummy, chunks, setter = captures.pop()
+            setter("".join(chunks))
+
+    def _chardata(data):
+        for capture in captures:
+            capture[1].append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = _start
+    parser.EndElementHandler = _end
+    parser.CharacterDataHandler = _chardata
+    parser.Parse(xml, True)
+    return rootname[0], values, lists
+
+
+########################
+# lxml.etree based API #
+########################
+
+# lxml is optional, only imported when the backend is selected
+etree = None
+
+# xpath string -> compiled etree.XPath
+_lxml_xpath_cache = {}
+# etree parsers aren't safe to share between threads
+_lxml_parsers = threading.local()
+
+
+def _import_lxml():
+    global etree
+    if etree is None:
+        from lxml import etree as _etree
+        etree = _etree
+    return etree
+
+
+def _lxml_parse(xml):
+    parser = getattr(_lxml_parsers, "parser", None)
+    if parser is None:
+        # Match libxml2.parseDoc defaults, so output is byte identical
+        parser = etree.XMLParser(remove_blank_text=False,
+                strip_cdata=False, resolve_entities=False)
+        _lxml_parsers.parser = parser
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    return etree.fromstring(xml, parser)
+
+
+def _lxml_compile(xpath):
+    ret = _lxml_xpath_cache.get(xpath)
+    if ret is None:
+        if len(_lxml_xpath_cache) >= _XPATH_CACHE_MAX:
+            _lxml_xpath_cache.clear()  # pragma: no cover
+        ret = etree.XPath(xpath, namespaces=_XMLBase.NAMESPACES,
+                smart_strings=False)
+        _lxml_xpath_cache[xpath] = ret
+    return ret
+
+
+def _lxml_qname(node, name):
+    """
+    Convert a possibly prefixed 'ns:name' into lxml '{uri}name' format
+    """
+    if ":" not in name:
+        return name
+    nsname, name = name.split(":")
+    uri = node.nsmap.get(nsname) or _XMLBase.NAMESPACES[nsname]
+    return "{%s}%s" % (uri, name)
+
+
+def _lxml_last_text(node):
+    """
+    Return the text trailing the last child of node, which libxml2
+    would represent as a text node
+    """
+    if len(node):
+        return node[-1].tail or None
+    return node.text or None
+
+
+def _lxml_prev_text(node):
+    """
+    Return the text directly preceding node
+    """
+    prev = node.getprevious()
+    if prev is not None:
+        return prev.tail or None
+    parent = node.getparent()
+    if parent is not None:
+        return parent.text or None
+    return None
+
+
+class _LxmlAPI(_XMLBase):
+    """
+    lxml.etree implementation. lxml doesn't have text nodes, text lives
+    in the .text and .tail of elements, so the whitespace handling here
+    mirrors what _Libxml2API does with explicit text nodes
+    """
+    BACKEND_NAME = "lxml"
+
+    @staticmethod
+    def check_available():
+        _import_lxml()
+
+    def __init__(self, xml):
+        _XMLBase.__init__(self)
+        _import_lxml()
+        self._root = None
+        if xml is not None:
+            self._root = _lxml_parse(xml)
+
+    def _sanitize_xml(self, xml):
+        if not xml.endswith("\n") and "\n" in xml:
+            xml += "\n"
+        return xml
+
+    def copy_api(self):
+        ret = _LxmlAPI(None)
+        ret._root = copy.deepcopy(self._root)
+        return ret
+
+    def _xpath_eval(self, xpath):
+        return _lxml_compile(xpath)(self._root)
+    def _xpath_eval_relative(self, basenode, xpath):
+        return _lxml_compile(xpath)(basenode)
+
+    def count(self, xpath):
+        return len(_lxml_compile(xpath)(self._root))
+
+    def _node_tostring(self, node):
+        return etree.tostring(node, encoding="unicode", with_tail=False)
+    def _node_from_xml(self, xml):
+        return _lxml_parse(xml)
+
+    def _node_get_text(self, node):
+        if not len(node):
+            return node.text or ""
+        return "".join(node.itertext())
+    def _node_set_text(self, node, setval):
+        if len(node):
+            self._invalidate_node_cache()
+            for child in list(node):
+                node.remove(child)
+        # libxml2 setContent("") doesn't create a text node either
+        node.text = setval or None
+
+    def _node_get_property(self, node, propname):
+        return node.get(_lxml_qname(node, propname))
+    def _node_set_property(self, node, propname, setval):
+        self._node_cache_propcond.clear()
+        propname = _lxml_qname(node, propname)
+        if setval is None:
+            node.attrib.pop(propname, None)
+        else:
+            node.set(propname, setval)
+
+    def _node_new(self, xpathseg, parentnode):
+        if not xpathseg.nsname:
+            return etree.Element(xpathseg.nodename)
+
+        # lxml drops the nsmap declaration if it is redundant with
+        # a parent once the node is added
+        uri = (parentnode.nsmap.get(xpathseg.nsname) or
+               self.NAMESPACES[xpathseg.nsname])
+        return etree.Element("{%s}%s" % (uri, xpathseg.nodename),
+                nsmap={xpathseg.nsname: uri})
+
+    def node_clear(self, xpath):
+        self.bump_revision()
+        node = self._find(xpath)
+        if node is not None:
+            self._invalidate_node_cache()
+            node.attrib.clear()
+            for child in list(node):
+                node.remove(child)
+            node.text = None
+
+    def _node_has_content(self, node):
+        return (isinstance(node.tag, str) and
+                bool(len(node) or node.text or node.attrib))
+
+    def _node_get_name(self, node):
+        return etree.QName(node).localname
+
+    def _node_remove_child(self, parentnode, childnode):
+        self._invalidate_node_cache()
+
+        # Drop the preceding whitespace, but keep the text that
+        # follows childnode, which lxml would remove along with it
+        prev = childnode.getprevious()
+        tail = childnode.tail
+        parentnode.remove(childnode)
+        if prev is not None:
+            prev.tail = tail
+        else:
+            parentnode.text = tail
+
+        if not len(parentnode):
+            parentnode.text = None
+
+    def _node_add_child(self, parentxpath, parentnode, newnode):
+        ignore = parentxpath
+        self._invalidate_node_cache()
+        endtext = _lxml_last_text(parentnode)
+        if endtext is None:
+            endtext = _lxml_prev_text(parentnode) or "\n"
+
+        if len(parentnode):
+            parentnode[-1].tail = endtext + "  "
+        else:
+            parentnode.text = endtext + "  "
+        newnode.tail = endtext
+        parentnode.append(newnode)
+
+    def _node_replace_child(self, xpath, newnode):
+        oldnode = self._find(xpath)
+        self._invalidate_node_cache()
+        parent = oldnode.getparent()
+        if parent is None:
+            self._root = newnode  # pragma: no cover
+            return  # pragma: no cover
+        newnode.tail = oldnode.tail
+        parent.replace(oldnode, newnode)
+
+
+##################
+# Backend choice #
+##################
+
+_BACKENDS = {
+    _Libxml2API.BACKEND_NAME: _Libxml2API,
+    _LxmlAPI.BACKEND_NAME: _LxmlAPI,
+}
+
 XMLAPI = _Libxml2API
+
+
+def get_backend_names():
+    return list(_BACKENDS)
+
+
+def set_backend(name):
+    """
+    Select the XMLAPI implementation used for any XML parsed from now on.
+    Raises ImportError if the backend's library isn't available
+    """
+    global XMLAPI
+    if name not in _BACKENDS:
+        raise ValueError("Unknown XMLAPI backend '%s', must be one of: %s" %
+                (name, ", ".join(get_backend_names())))
+    cls = _BACKENDS[name]
+    cls.check_available()
+    XMLAPI = cls
+
+
+def get_backend():
+    return XMLAPI.BACKEND_NAME
+
+
+def _set_backend_from_env():
+    name = os.environ.get("VIRTINST_XMLAPI")
+    if not name:
+        return
+    try:
+        set_backend(name)
+    except (ValueError, ImportError) as e:  # pragma: no cover
+        log.warning("Ignoring VIRTINST_XMLAPI=%s: %s", name, e)
+
+
+_set_backend_from_env()
@@ -6,14 +6,14 @@
 # This work is licensed under the GNU GPLv2 or later.
 # See the COPYING file in the top-level directory.
 
-import collections
 import os
 import re
 import string
+import sys
 import textwrap
 
 from .logger import log
-from .xmlapi import XMLAPI
+from . import xmlapi as _xmlapi
 from . import xmlutil
 
 
@@ -120,13 +120,21 @@ class _XMLChildList(list):
     This is just to insert a dynamically created add_new() function
     which instantiates and appends a new child object
     """
+    __slots__ = ("_childclass", "_xmlbuilder", "_is_xml")
+
     def __init__(self, childclass, copylist, xmlbuilder, is_xml=True):
         list.__init__(self)
         self._childclass = childclass
         self._xmlbuilder = xmlbuilder
         self._is_xml = is_xml
-        for i in copylist:
-            self.append(i)
+        list.extend(self, copylist)
+
+    def _changed(self):
+        # Plain object lists like xml_actions aren't tracked by the XML
+        # document, so bump its revision by hand. That invalidates the
+        # get_xml cache of the object tree
+        if not self._is_xml:
+            self._xmlbuilder._xmlstate.xmlapi.bump_revision()
 
     def new(self):
         """
@@ -149,6 +157,20 @@ class _XMLChildList(list):
         return obj
 
 
+def _make_child_list_mutator(name):
+    func = getattr(list, name)
+    def _mutator(self, *args):
+        ret = func(self, *args)
+        self._changed()  # pylint: disable=protected-access
+        return ret
+    return _mutator
+
+
+for _name in ["append", "extend", "insert", "remove", "pop", "clear",
+              "sort", "reverse", "__setitem__", "__delitem__", "__iadd__"]:
+    setattr(_XMLChildList, _name, _make_child_list_mutator(_name))
+
+
 class _XMLPropertyBase(property):
     def __init__(self, fget, fset):
         self._propname = None
@@ -195,8 +217,10 @@ class XMLChildProperty(_XMLPropertyBase):
 
 
     def _get(self, xmlbuilder):
-        if self.propname not in xmlbuilder._propstore and not self.is_single:
-            xmlbuilder._propstore[self.propname] = []
+        if self.propname not in xmlbuilder._propstore:
+            # Child objects are built on first access
+            xmlbuilder._propstore[self.propname] = (
+                    xmlbuilder._parse_child_prop(self))
         return xmlbuilder._propstore[self.propname]
 
     def _fget(self, xmlbuilder):
@@ -215,12 +239,13 @@ class XMLChildProperty(_XMLPropertyBase):
 
     def insert(self, xmlbuilder, newobj, idx):
         self._get(xmlbuilder).insert(idx, newobj)
+        xmlbuilder._xmlstate.xmlapi.bump_revision()
     def append(self, xmlbuilder, newobj):
         self._get(xmlbuilder).append(newobj)
+        xmlbuilder._xmlstate.xmlapi.bump_revision()
     def remove(self, xmlbuilder, obj):
         self._get(xmlbuilder).remove(obj)
-    def set(self, xmlbuilder, obj):
-        xmlbuilder._propstore[self.propname] = obj
+        xmlbuilder._xmlstate.xmlapi.bump_revision()
 
     def get_prop_xpath(self, _xmlbuilder, obj):
         return self.relative_xpath + "/" + obj.XML_NAME
@@ -334,6 +359,14 @@ class XMLProperty(_XMLPropertyBase):
             val = int(val, **intkwargs)
         return val
 
+    def convert_value(self, val):
+        """
+        Return val converted the same way as setting it on an object
+        and reading it back would, without touching any object. Used
+        to compare user input against the current property value
+        """
+        return self._convert_get_value(self._convert_set_value(val))
+
     def _nonxml_fset(self, xmlbuilder, val):
         """
         This stores the value in XMLBuilder._propstore
@@ -345,6 +378,7 @@ class XMLProperty(_XMLPropertyBase):
         if self.propname in propstore:
             del propstore[self.propname]
         propstore[self.propname] = val
+        xmlbuilder._xmlstate.xmlapi.bump_revision()
 
     def _nonxml_fget(self, xmlbuilder):
         """
@@ -353,6 +387,11 @@ class XMLProperty(_XMLPropertyBase):
         """
         return xmlbuilder._propstore.get(self.propname, None)
 
+    def _track_usage(self):
+        if _trackprops and not self._is_tracked:
+            _seenprops.append(self)
+            self._is_tracked = True
+
     def clear(self, xmlbuilder):
         # We only unset the cached data, since XML will be cleared elsewhere
         propstore = xmlbuilder._propstore
@@ -374,9 +413,7 @@ class XMLProperty(_XMLPropertyBase):
         since it's known to the empty, and we may want to return
         a 'default' value
         """
-        if _trackprops and not self._is_tracked:
-            _seenprops.append(self)
-            self._is_tracked = True
+        self._track_usage()
 
         if self.propname in xmlbuilder._propstore:
             val = self._nonxml_fget(xmlbuilder)
@@ -384,6 +421,16 @@ class XMLProperty(_XMLPropertyBase):
             val = self._get_xml(xmlbuilder)
         return self._convert_get_value(val)
 
+    def _snapshot_value(self, xmlbuilder, xmlval):
+        """
+        Helper for XMLBuilder.get_props_snapshot. Same as getter, but
+        with the XML value already looked up by the caller
+        """
+        self._track_usage()
+        if self.propname in xmlbuilder._propstore:
+            xmlval = self._nonxml_fget(xmlbuilder)
+        return self._convert_get_value(xmlval)
+
     def _get_xml(self, xmlbuilder):
         """
         Actually fetch the associated value from the backing XML
@@ -398,9 +445,7 @@ class XMLProperty(_XMLPropertyBase):
         in propstore. Setting the actual XML is only done at
         get_xml time.
         """
-        if _trackprops and not self._is_tracked:
-            _seenprops.append(self)
-            self._is_tracked = True
+        self._track_usage()
 
         setval = self._convert_set_value(val)
         self._nonxml_fset(xmlbuilder, setval)
@@ -413,25 +458,63 @@ class XMLProperty(_XMLPropertyBase):
         xmlbuilder._xmlstate.xmlapi.set_xpath_content(xpath, setval)
 
 
+class XMLPropertySnapshot(object):
+    """
+    Read only copy of XMLProperty values, as returned by
+    XMLBuilder.get_props_snapshot. Values are accessed as attributes,
+    the same as on the XMLBuilder object they came from.
+    """
+    def __init__(self, values):
+        object.__setattr__(self, "_values", values)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, val):
+        raise AttributeError("%s is read only" % self.__class__.__name__)
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self._values)
+
+    def as_dict(self):
+        return self._values.copy()
+
+
+def _intern_xpath(xpath):
+    """
+    xpath strings like './devices/disk[3]' are repeated across every
+    parsed object, so share a single copy of each
+    """
+    return sys.intern(xpath or "")
+
+
 class _XMLState(object):
+    # There's one of these per XMLBuilder, so keep them compact
+    __slots__ = ("_root_name", "_namespace", "_relative_object_xpath",
+                 "_parent_xpath", "xmlapi", "is_build")
+
     def __init__(self, root_name, parsexml, parentxmlstate,
                  relative_object_xpath):
         self._root_name = root_name
         self._namespace = ""
         if ":" in self._root_name:
             ns = self._root_name.split(":")[0]
-            self._namespace = " xmlns:%s='%s'" % (ns, XMLAPI.NAMESPACES[ns])
+            self._namespace = " xmlns:%s='%s'" % (
+                    ns, _xmlapi.XMLAPI.NAMESPACES[ns])
 
         # xpath of this object relative to its parent. So for a standalone
         # <disk> this is empty, but if the disk is the forth one in a <domain>
         # it will be set to ./devices/disk[4]
-        self._relative_object_xpath = relative_object_xpath or ""
+        self._relative_object_xpath = _intern_xpath(relative_object_xpath)
 
         # xpath of the parent. For a disk in a standalone <domain>, this
         # is empty, but if the <domain> is part of a <domainsnapshot>,
         # it will be "./domain"
-        self._parent_xpath = (
-            parentxmlstate and parentxmlstate.abs_xpath()) or ""
+        self._parent_xpath = _intern_xpath(
+            parentxmlstate and parentxmlstate.abs_xpath())
 
         self.xmlapi = None
         self.is_build = not parsexml and not parentxmlstate
@@ -451,7 +534,7 @@ class _XMLState(object):
                     "<" + self._root_name + self._namespace)
 
         try:
-            self.xmlapi = XMLAPI(parsexml)
+            self.xmlapi = _xmlapi.XMLAPI(parsexml)
         except Exception:
             log.debug("Error parsing xml=\n%s", parsexml)
             raise
@@ -461,10 +544,10 @@ class _XMLState(object):
             self.xmlapi.validate_root_name(self._root_name.split(":")[-1])
 
     def set_relative_object_xpath(self, xpath):
-        self._relative_object_xpath = xpath or ""
+        self._relative_object_xpath = _intern_xpath(xpath)
 
     def set_parent_xpath(self, xpath):
-        self._parent_xpath = xpath or ""
+        self._parent_xpath = _intern_xpath(xpath)
 
     def _join_xpath(self, x1, x2):
         if x2.startswith("."):
@@ -490,6 +573,11 @@ class XMLBuilder(object):
     """
     Base for all classes which build or parse domain XML
     """
+    # The base bookkeeping lives in slots. Subclasses don't declare
+    # __slots__, so they still get a __dict__ for their own attributes
+    __slots__ = ("conn", "_propstore", "_xml_cache", "_snapshot_cache",
+                 "_xmlstate", "xml_actions")
+
     # Order that we should apply values to the XML. Keeps XML generation
     # consistent with what the test suite expects.
     _XML_PROP_ORDER = []
@@ -507,7 +595,42 @@ class XMLBuilder(object):
 
     @staticmethod
     def register_namespace(nsname, uri):
-        XMLAPI.register_namespace(nsname, uri)
+        _xmlapi.XMLAPI.register_namespace(nsname, uri)
+
+    @classmethod
+    def _stream_xml_props(cls, parsexml, listxpaths=None):
+        """
+        Pull all our XMLProperty values out of parsexml in a single
+        streaming pass with xmlapi.stream_extract, without building a
+        document. XMLChildProperty objects aren't handled, but the caller
+        can request matching elements with listxpaths.
+
+        :returns: (dict of propname -> (XMLProperty, value),
+            stream_extract lists output), or None if the XML or our
+            xpaths can't be handled, and a full parse is needed
+        """
+        if cls._XML_SANITIZE:
+            parsexml = cls._sanitize_parsexml(parsexml)
+        props = list(_PropCache._get_prop_cache(cls, XMLProperty).items())
+        try:
+            rootname, xmlvals, lists = _xmlapi.stream_extract(parsexml,
+                    [(prop._xpath, prop._is_bool) for dummy, prop in props],
+                    listxpaths)
+        except Exception as e:
+            log.debug("Can't stream parse %s XML: %s", cls.__name__, e)
+            return None
+        if rootname != cls.XML_NAME:
+            return None
+
+        values = {}
+        for (propname, prop), xmlval in zip(props, xmlvals):
+            values[propname] = (prop, prop._convert_get_value(xmlval))
+        return values, lists
+
+    @staticmethod
+    def _sanitize_parsexml(parsexml):
+        parsexml = parsexml.encode("ascii", "ignore").decode("ascii")
+        return "".join([c for c in parsexml if c in string.printable])
 
     @staticmethod
     def validate_generic_name(name_label, val):
@@ -540,16 +663,18 @@ class XMLBuilder(object):
         self.conn = conn
 
         if self._XML_SANITIZE:
-            parsexml = parsexml.encode("ascii", "ignore").decode("ascii")
-            parsexml = "".join([c for c in parsexml if c in string.printable])
+            parsexml = self._sanitize_parsexml(parsexml)
 
-        self._propstore = collections.OrderedDict()
+        self._propstore = {}
+        # (cache key, xml) of the last get_xml() call for build objects
+        self._xml_cache = None
+        # (cache key, XMLPropertySnapshot) of the last get_props_snapshot
+        self._snapshot_cache = None
         self._xmlstate = _XMLState(self.XML_NAME,
                                    parsexml, parentxmlstate,
                                    relative_object_xpath)
 
         self._validate_xmlbuilder()
-        self._initial_child_parse()
         self.xml_actions = _XMLChildList(
                 XMLManualAction, [], self, is_xml=False)
 
@@ -576,28 +701,56 @@ class XMLBuilder(object):
 
         setattr(self.__class__, cachekey, True)
 
-    def _initial_child_parse(self):
-        # Walk the XML tree and hand of parsing to any registered
-        # child classes
-        for xmlprop in list(self._all_child_props().values()):
-            child_class = xmlprop.child_class
-            prop_path = xmlprop.get_prop_xpath(self, child_class)
+    def _parse_child_prop(self, xmlprop):
+        """
+        Hand off parsing of the XML tracked by xmlprop to its child class.
+        This happens on first access of the XMLChildProperty, rather than
+        at parse time, so users that only want a few top level values
+        don't pay for building every device object.
+        """
+        child_class = xmlprop.child_class
+        prop_path = xmlprop.get_prop_xpath(self, child_class)
+
+        if xmlprop.is_single:
+            return child_class(self.conn,
+                parentxmlstate=self._xmlstate,
+                relative_object_xpath=prop_path)
+
+        ret = []
+        nodecount = self._xmlstate.xmlapi.count(
+            self._xmlstate.make_abs_xpath(prop_path))
+        for idx in range(nodecount):
+            idxstr = "[%d]" % (idx + 1)
+            obj = child_class(self.conn,
+                parentxmlstate=self._xmlstate,
+                relative_object_xpath=(prop_path + idxstr))
+            ret.append(obj)
+        return ret
 
-            if xmlprop.is_single:
-                obj = child_class(self.conn,
-                    parentxmlstate=self._xmlstate,
-                    relative_object_xpath=prop_path)
-                xmlprop.set(self, obj)
+    def _has_xml_actions(self):
+        """
+        Return True if we or any child object have xml_actions set
+        """
+        if self.xml_actions:
+            return True
+        for xmlprop in self._all_child_props().values():
+            for obj in xmlutil.listify(xmlprop._get(self)):
+                if obj._has_xml_actions():
+                    return True
+        return False
+
+    def _parse_all_child_props(self, recursive=False):
+        """
+        Build any child objects that haven't been accessed yet. This
+        must be done before the XML or our xpaths change, otherwise
+        the children would be parsed from the altered state.
+        """
+        for xmlprop in self._all_child_props().values():
+            children = xmlprop._get(self)
+            if not recursive:
                 continue
-
-            nodecount = self._xmlstate.xmlapi.count(
-                self._xmlstate.make_abs_xpath(prop_path))
-            for idx in range(nodecount):
-                idxstr = "[%d]" % (idx + 1)
-                obj = child_class(self.conn,
-                    parentxmlstate=self._xmlstate,
-                    relative_object_xpath=(prop_path + idxstr))
-                xmlprop.append(self, obj)
+            for obj in xmlutil.listify(children):
+                obj._parse_all_child_props(recursive=True)
 
     def __repr__(self):
         return "<%s %s %s>" % (self.__class__.__name__.split(".")[-1],
@@ -613,21 +766,71 @@ class XMLBuilder(object):
         Return XML string of the object
         """
         xmlapi = self._xmlstate.xmlapi
+
+        # Building the XML means copying the whole document and
+        # applying every property. The document revision is bumped
+        # by any property, child, or xml_actions change in the object
+        # tree, so if it hasn't moved we can reuse the last result
+        # without walking the tree at all.
+        cachekey = None
+        if self._xmlstate.is_build:
+            cachekey = (xmlapi.revision, self._xmlstate.abs_xpath())
+            if self._xml_cache and self._xml_cache[0] == cachekey:
+                return self._xml_cache[1]
+
+        self._parse_all_child_props(recursive=True)
+        if cachekey and self._has_xml_actions():
+            # xml_actions are plain objects whose contents we can't
+            # track, so those are never cached
+            cachekey = None
+
         if self._xmlstate.is_build:
             xmlapi = xmlapi.copy_api()
 
         self._add_parse_bits(xmlapi)
         ret = xmlapi.get_xml(self._xmlstate.make_abs_xpath("."))
 
-        if not ret:
-            return ret
+        if ret:
+            lastline = ret.rstrip().splitlines()[-1]
+            if not ret.startswith(" ") and lastline.startswith(" "):
+                ret = lastline.split("<")[0] + ret
 
-        lastline = ret.rstrip().splitlines()[-1]
-        if not ret.startswith(" ") and lastline.startswith(" "):
-            ret = lastline.split("<")[0] + ret
+            if not ret.endswith("\n"):
+                ret += "\n"
 
-        if not ret.endswith("\n"):
-            ret += "\n"
+        if cachekey:
+            self._xml_cache = (cachekey, ret)
+        return ret
+
+    def get_props_snapshot(self, propnames=None):
+        """
+        Return an XMLPropertySnapshot with the values of the passed list
+        of XMLProperty names, default is all of them. The values are the
+        same as reading each property in turn, but our XML node is only
+        looked up once. The result is cached until anything alters the
+        XML document.
+        """
+        xmlprops = self._all_xml_props()
+        if propnames is None:
+            propnames = tuple(xmlprops)
+        else:
+            propnames = tuple(propnames)
+
+        xmlapi = self._xmlstate.xmlapi
+        basexpath = self._xmlstate.abs_xpath()
+        cachekey = (xmlapi.revision, basexpath, propnames)
+        if self._snapshot_cache and self._snapshot_cache[0] == cachekey:
+            return self._snapshot_cache[1]
+
+        props = [xmlprops[name] for name in propnames]
+        xmlvals = xmlapi.get_xpath_contents(basexpath,
+                [(prop._xpath, prop._is_bool) for prop in props])
+
+        values = {}
+        for prop, xmlval in zip(props, xmlvals):
+            values[prop.propname] = prop._snapshot_value(self, xmlval)
+        ret = XMLPropertySnapshot(values)
+        self._snapshot_cache = (cachekey, ret)
         return ret
 
     def clear(self, leave_stub=False):
@@ -720,6 +923,7 @@ class XMLBuilder(object):
         """
         Change the object hierarchy's cached xpaths
         """
+        self._parse_all_child_props()
         self._xmlstate.set_parent_xpath(parent_xpath)
         if relative_object_xpath != -1:
             self._xmlstate.set_relative_object_xpath(relative_object_xpath)
@@ -752,6 +956,7 @@ class XMLBuilder(object):
         """
         Set new backing XML objects in ourselves and all our child props
         """
+        self._parse_all_child_props()
         self._xmlstate.parse(*args, **kwargs)
         for propname in self._all_child_props():
             for p in xmlutil.listify(getattr(self, propname, [])):
@@ -788,6 +993,10 @@ class XMLBuilder(object):
         """
         xmlprop = self._find_child_prop(obj.__class__)
         xmlprop.remove(self, obj)
+        # Removing the XML node shifts the xpath index of all following
+        # siblings, so their children need to be parsed beforehand
+        for sibling in xmlprop._get(self):
+            sibling._parse_all_child_props(recursive=True)
 
         xpath = obj._xmlstate.abs_xpath()
         xml = obj.get_xml()
@@ -805,6 +1014,7 @@ class XMLBuilder(object):
         our usecases.
         """
         if not self._xmlstate.is_build:
+            origobj._parse_all_child_props(recursive=True)
             xpath = origobj.get_xml_id()
             indent = 2 * xpath.count("/")
             xml = textwrap.indent(newobj.get_xml(), indent * " ").strip()